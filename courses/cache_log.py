@@ -0,0 +1,70 @@
+"""Append-only log of ids in the cache, drained by a periodic command.
+
+Writers claim a slot number with an atomic ``incr`` and store the value
+under it; the reader walks only the slots written since its previous run.
+Just ``incr``, ``set`` and ``get_many`` are needed, but the writers (web
+processes) and the reader (a cron command) must share the cache: check
+``cache_is_shared`` before relying on it.
+"""
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def cache_is_shared():
+    """False when the default cache lives inside each process (LocMem) or stores nothing."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+class CacheLog:
+    # Slot đã cấp số mà vẫn trống sau chừng này lượt đọc: tiến trình ghi đã chết giữa incr và set
+    MAX_SLOT_RETRIES = 10
+    # Khóa tự hết hạn nếu lượt đọc chết giữa chừng
+    DRAIN_LOCK_TIMEOUT = 60 * 10
+
+    def __init__(self, name):
+        self.seq_key = f'{name}:seq'
+        self.done_key = f'{name}:done'
+        self.retry_key = f'{name}:retry'
+        self.lock_key = f'{name}:draining'
+        self.slot_key = f'{name}:{{}}'
+
+    def append(self, value):
+        cache.set(self.slot_key.format(_incr(self.seq_key)), value, None)
+
+    def drain(self, batch_size):
+        """Yield the sets of values appended since the last drain, ``batch_size`` slots at a time.
+
+        Only one drain runs at a time; a concurrent call yields nothing. A
+        slot is deleted once the consumer has taken its batch, and slots
+        found empty are retried on later drains instead of being skipped.
+        """
+        if not cache.add(self.lock_key, 1, self.DRAIN_LOCK_TIMEOUT):
+            return
+        try:
+            done = cache.get(self.done_key, 0)
+            last = cache.get(self.seq_key, 0)
+            retries = cache.get(self.retry_key, {})
+            slots = sorted(retries) + list(range(done + 1, last + 1))
+            missing = {}
+            for start in range(0, len(slots), batch_size):
+                keys = {self.slot_key.format(n): n for n in slots[start:start + batch_size]}
+                found = cache.get_many(list(keys))
+                for key, n in keys.items():
+                    if key not in found:
+                        missing[n] = retries.get(n, 0) + 1
+                if found:
+                    yield set(found.values())
+                    cache.delete_many(list(found))
+            cache.set(self.retry_key, {n: tries for n, tries in missing.items() if tries < self.MAX_SLOT_RETRIES}, None)
+            cache.set(self.done_key, last, None)
+        finally:
+            cache.delete(self.lock_key)
@@ -0,0 +1,94 @@
+"""Catalog queries shared by the course list, search and cart pages."""
+from django.core.cache import cache
+from django.db.models import Count
+from django.urls import reverse
+from django.utils.text import Truncator
+
+from .models import Course
+from .pagination import KeysetPaginator
+from .templatetags.vn_filters import vn_thousand
+
+# Sort key -> ORDER BY; every column here is indexed (Course or CourseStats).
+# Each ordering ends in the primary key so it is total, as keyset paging needs.
+SORT_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+    'popular': ('-stats__enrollment_count', '-created_at', '-id'),
+    'rating': ('-stats__average_rating', '-created_at', '-id'),
+}
+DEFAULT_SORT = 'newest'
+
+
+PAGE_SIZE = 9
+
+
+def catalog_ordering(sort):
+    return SORT_ORDERINGS.get(sort, SORT_ORDERINGS[DEFAULT_SORT])
+
+
+def catalog_queryset(category='', sort=DEFAULT_SORT, queryset=None):
+    """Courses joined with their stats row, filtered and ordered for listing."""
+    courses = (queryset if queryset is not None else Course.objects.all()).select_related('stats')
+    if category:
+        courses = courses.filter(category=category)
+    return courses.order_by(*catalog_ordering(sort))
+
+
+def catalog_paginator(courses, sort):
+    """Keyset paginator over a ``catalog_queryset``; cursors are tied to ``sort``."""
+    return KeysetPaginator(courses, catalog_ordering(sort), PAGE_SIZE, salt=f'catalog-cursor:{sort}')
+
+
+FACET_CACHE_KEY = 'catalog:category-counts'
+FACET_CACHE_TIMEOUT = 60 * 60
+
+
+def category_counts():
+    """Course count per ``Course.CATEGORY_CHOICES`` value plus ``'all'``.
+
+    One grouped query, cached until a Course is saved or deleted.
+    """
+    counts = cache.get(FACET_CACHE_KEY)
+    if counts is None:
+        grouped = dict(Course.objects.values_list('category').annotate(n=Count('id')).order_by())
+        counts = {value: grouped.get(value, 0) for value, _ in Course.CATEGORY_CHOICES}
+        counts['all'] = sum(grouped.values())
+        cache.set(FACET_CACHE_KEY, counts, FACET_CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate_category_counts():
+    cache.delete(FACET_CACHE_KEY)
+
+
+def course_card(course, state=None):
+    """The fields a catalog card renders, for the JSON catalog API.
+
+    ``state`` is the request's ``UserCourseState``; it adds the per-user
+    owned/in-cart/wishlisted flags without extra queries.
+    """
+    stats = getattr(course, 'stats', None)
+    card = {
+        'id': course.id,
+        'title': course.title,
+        'description': Truncator(course.description).words(15),
+        'category': course.category,
+        'category_label': course.get_category_display(),
+        'price': str(course.price),
+        'price_display': vn_thousand(course.price),
+        'enrollment_count': stats.enrollment_count if stats else 0,
+        'average_rating': round(stats.average_rating, 1) if stats else 0,
+        'review_count': stats.review_count if stats else 0,
+        'detail_url': reverse('course_detail', args=[course.id]),
+        'add_to_cart_url': reverse('add_to_cart', args=[course.id]),
+        'checkout_url': reverse('checkout_direct', args=[course.id]),
+        'learning_path_url': reverse('learning_path', args=[course.id]),
+    }
+    if state is not None:
+        card.update({
+            'owned': course.id in state.accessible,
+            'in_cart': course.id in state.in_cart,
+            'wishlisted': course.id in state.wishlisted,
+        })
+    return card
@@ -0,0 +1,56 @@
+"""Site-wide community totals (posts, comments, users, courses) kept in cache.
+
+Each total is its own cache key so the signal handlers in ``signals.py``
+can adjust it with an atomic ``incr``/``decr`` on create and delete. A
+missing key is recounted on the next read and stored for
+``COMMUNITY_STATS_TIMEOUT``; that expiry doubles as the periodic
+reconciliation, and ``reconcile_community_stats`` forces it.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import Course, ForumPost, PostComment
+
+COMMUNITY_STATS_KEY = 'community:{}'
+# Đếm lại định kỳ để sửa sai lệch (rollback, xóa hàng loạt bằng update/raw SQL)
+COMMUNITY_STATS_TIMEOUT = 60 * 15
+
+COUNTED_MODELS = {
+    'posts': ForumPost,
+    'comments': PostComment,
+    'users': User,
+    'courses': Course,
+}
+
+
+def _key(name):
+    return COMMUNITY_STATS_KEY.format(name)
+
+
+def community_stats():
+    """``{'posts': n, 'comments': n, 'users': n, 'courses': n}``; one cache round trip when warm."""
+    cached = cache.get_many([_key(name) for name in COUNTED_MODELS])
+    stats = {}
+    for name, model in COUNTED_MODELS.items():
+        value = cached.get(_key(name))
+        if value is None:
+            value = model.objects.count()
+            # add: không ghi đè một incr vừa xảy ra ở tiến trình khác
+            cache.add(_key(name), value, COMMUNITY_STATS_TIMEOUT)
+        stats[name] = value
+    return stats
+
+
+def bump_community_stat(name, delta):
+    """Adjust one total; a cold key is left for the next read to recount."""
+    try:
+        cache.incr(_key(name), delta)
+    except ValueError:
+        pass
+
+
+def reconcile_community_stats():
+    """Recount every total from its table and store it; returns the fresh values."""
+    stats = {name: model.objects.count() for name, model in COUNTED_MODELS.items()}
+    cache.set_many({_key(name): value for name, value in stats.items()}, COMMUNITY_STATS_TIMEOUT)
+    return stats
@@ -0,0 +1,17 @@
+from .catalog import category_counts
+from .models import Course
+
+
+def catalog_facets(request):
+    """Expose category counts to every page (the category grid lives in base.html).
+
+    Provides ``category_facets`` as ``(value, label, count)`` tuples plus the
+    ``<value>_count`` / ``all_count`` variables the templates already use.
+    """
+    counts = category_counts()
+    context = {f'{value}_count': counts[value] for value, _ in Course.CATEGORY_CHOICES}
+    context['all_count'] = counts['all']
+    context['category_facets'] = [
+        (value, label, counts[value]) for value, label in Course.CATEGORY_CHOICES
+    ]
+    return context
@@ -0,0 +1,191 @@
+"""In-process event bus for the forum activity feed.
+
+New posts and comments are published here (from the ``post_save`` handlers,
+after commit) into a short ring buffer with increasing ``seq`` numbers.
+The SSE stream and the long-poll fallback wait on the bus instead of
+querying, so an idle client costs no database work and new events are
+pushed as soon as they are published. The buffer is seeded from the
+database once per process.
+
+The bus is per process: serve the app from a single ASGI worker
+(``mycourse.asgi``), or events published by one worker will not reach
+clients connected to another.
+"""
+import asyncio
+import threading
+import uuid
+from collections import deque
+
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import ForumPost, PostComment
+
+BACKLOG_SIZE = 50
+RECENT_LIMIT = 10
+KEEPALIVE_INTERVAL = 15
+LONG_POLL_TIMEOUT = 25
+# Đóng luồng SSE định kỳ; EventSource tự kết nối lại với Last-Event-ID
+STREAM_MAX_AGE = 60 * 5
+RETRY_MS = 3000
+ACTIVITY_VERSION_KEY = 'forum:activity:version'
+
+
+def post_event(post):
+    return {
+        'type': 'post',
+        'id': post.id,
+        'user': post.author.username,
+        'title': post.title,
+        'created_at': post.created_at.isoformat(),
+    }
+
+
+def comment_event(comment):
+    return {
+        'type': 'comment',
+        'id': comment.id,
+        'user': comment.author.username,
+        'post_id': comment.post_id,
+        'content': comment.content[:140],
+        'created_at': comment.created_at.isoformat(),
+    }
+
+
+def activity_marker():
+    """``(max post id, max comment id)``: two primary-key lookups, changes on every new event."""
+    return (
+        ForumPost.objects.aggregate(m=Max('id'))['m'] or 0,
+        PostComment.objects.aggregate(m=Max('id'))['m'] or 0,
+    )
+
+
+def activity_version():
+    """Token replaced when an existing post or comment is edited or deleted.
+
+    ``activity_marker`` only moves on new rows; the feed ETag carries this too.
+    """
+    version = cache.get(ACTIVITY_VERSION_KEY)
+    if version is None:
+        cache.add(ACTIVITY_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(ACTIVITY_VERSION_KEY)
+    return version
+
+
+def bump_activity_version():
+    cache.set(ACTIVITY_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def format_activity_cursor(marker):
+    return '%d-%d' % marker
+
+
+def parse_activity_cursor(value):
+    """Inverse of ``format_activity_cursor``; ``None`` for a malformed value."""
+    try:
+        post_id, comment_id = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    return post_id, comment_id
+
+
+def load_recent_activity(limit=RECENT_LIMIT, since=None):
+    """Latest posts and comments from the database, newest first.
+
+    ``since`` is an ``activity_marker()``; only events created after it are returned.
+    """
+    posts = ForumPost.objects.select_related('author')
+    comments = PostComment.objects.select_related('author')
+    if since is not None:
+        posts = posts.filter(id__gt=since[0])
+        comments = comments.filter(id__gt=since[1])
+    posts = posts.order_by('-created_at')[:limit]
+    comments = comments.order_by('-created_at')[:limit]
+    events = [post_event(p) for p in posts] + [comment_event(c) for c in comments]
+    return sorted(events, key=lambda e: e['created_at'], reverse=True)[:limit]
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ActivityBus:
+    def __init__(self, size=BACKLOG_SIZE):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self._waiters = set()
+        self._seeded = False
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def ensure_seeded(self):
+        """Fill the buffer from the database the first time it is used."""
+        if self._seeded:
+            return
+        recent = load_recent_activity()
+        with self._lock:
+            if self._seeded:
+                return
+            for event in reversed(recent):
+                self._append(event)
+            self._seeded = True
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._seq = 0
+            self._seeded = False
+
+    def _append(self, event):
+        self._seq += 1
+        event = {**event, 'seq': self._seq}
+        self._events.append(event)
+        return event
+
+    def publish(self, event):
+        """Add ``event`` and wake every waiting client; safe from any thread."""
+        with self._lock:
+            if not self._seeded:
+                # Chưa ai theo dõi: lần seed đầu tiên sẽ đọc sự kiện này từ DB
+                return None
+            event = self._append(event)
+            waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return event
+
+    def since(self, seq):
+        """Buffered events after ``seq``, oldest first."""
+        with self._lock:
+            # seq lớn hơn hiện tại: client từ lần chạy trước của tiến trình, gửi lại từ đầu
+            if seq > self._seq:
+                seq = 0
+            return [event for event in self._events if event['seq'] > seq]
+
+    async def wait(self, seq, timeout):
+        """Events after ``seq``, waiting up to ``timeout`` seconds for one to arrive."""
+        events = self.since(seq)
+        if events:
+            return events
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            published = self._seq > seq
+            if not published:
+                self._waiters.add((loop, future))
+        if not published:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    self._waiters.discard((loop, future))
+        return self.since(seq)
+
+
+activity_bus = ActivityBus()
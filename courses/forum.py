@@ -0,0 +1,137 @@
+"""Forum listing queries shared by the forum list, tag and profile pages.
+
+``ForumPost.like_count`` / ``comment_count`` are denormalized: the PostLike
+and PostComment signal handlers adjust them with ``bump_post_counters`` and
+``refresh_post_counters`` (``reconcile_forum_counters`` command) repairs
+drift.
+
+Thread comments are keyset-paged on ``(post, id)`` with an ``after`` id, so
+``forum_detail`` and the ``forum_comments`` JSON endpoint share one query
+shape and "load more" never re-renders the thread.
+"""
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils.timesince import timesince
+
+from .models import ForumPost, PostComment, PostLike
+from .pagination import KeysetPaginator
+
+FORUM_PAGE_SIZE = 20
+COMMENT_PAGE_SIZE = 5
+
+# Sort key -> ORDER BY, each served by a ForumPost index (feed/popular/discussed).
+# `new` is keyset-paged on (is_pinned, created_at, id); the count sorts change
+# too often for stable cursors and use numbered pages.
+FORUM_ORDERINGS = {
+    'new': ('-is_pinned', '-created_at', '-id'),
+    'popular': ('-is_pinned', '-like_count', '-created_at', '-id'),
+    'comments': ('-is_pinned', '-comment_count', '-created_at', '-id'),
+}
+DEFAULT_FORUM_SORT = 'new'
+PROFILE_ORDERING = ('-created_at', '-id')
+
+
+def forum_queryset(queryset=None):
+    """Posts with their author joined, ready for a post card."""
+    posts = queryset if queryset is not None else ForumPost.objects.all()
+    # Thẻ bài viết chỉ dùng content (trích đoạn), không cần bản HTML
+    return posts.select_related('author').defer('content_html')
+
+
+def bump_post_counters(post_id, **deltas):
+    """Apply counter deltas (e.g. ``like_count=-1``) to one post, never below zero."""
+    for field, delta in deltas.items():
+        if not delta:
+            continue
+        posts = ForumPost.objects.filter(pk=post_id)
+        if delta < 0:
+            posts = posts.filter(**{f'{field}__gte': -delta})
+        posts.update(**{field: F(field) + delta})
+
+
+def refresh_post_counters(post_ids=None):
+    """Recount likes/comments from the source tables; returns how many posts were off."""
+    posts = ForumPost.objects.all()
+    likes = PostLike.objects.all()
+    comments = PostComment.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+        likes = likes.filter(post_id__in=post_ids)
+        comments = comments.filter(post_id__in=post_ids)
+    like_counts = dict(likes.values_list('post_id').annotate(n=Count('id')).order_by())
+    comment_counts = dict(comments.values_list('post_id').annotate(n=Count('id')).order_by())
+
+    drifted = []
+    for post in posts.only('id', 'like_count', 'comment_count'):
+        like_count = like_counts.get(post.pk, 0)
+        comment_count = comment_counts.get(post.pk, 0)
+        if (post.like_count, post.comment_count) != (like_count, comment_count):
+            post.like_count, post.comment_count = like_count, comment_count
+            drifted.append(post)
+    ForumPost.objects.bulk_update(drifted, ['like_count', 'comment_count'], batch_size=500)
+    return len(drifted)
+
+
+def forum_page(request, posts, sort, salt):
+    """The requested page of ``posts`` in ``sort`` order.
+
+    ``new`` is keyset-paged with the ``cursor`` parameter (no COUNT or
+    OFFSET); the other sorts use numbered pages via ``page``.
+    """
+    ordering = FORUM_ORDERINGS.get(sort, FORUM_ORDERINGS[DEFAULT_FORUM_SORT])
+    if ordering == FORUM_ORDERINGS['new']:
+        return KeysetPaginator(posts, ordering, FORUM_PAGE_SIZE, salt=salt).page(request.GET.get('cursor'))
+    return Paginator(posts.order_by(*ordering), FORUM_PAGE_SIZE).get_page(request.GET.get('page', 1))
+
+
+def toggle_post_like(user, post_id):
+    """Like or unlike ``post_id`` for ``user``; returns ``(liked, like_count)``.
+
+    The post row is locked first, so concurrent toggles (double clicks) run
+    one after the other instead of racing on the unique constraint, and the
+    count read under the lock plus this toggle is the exact new value.
+    Raises ``ForumPost.DoesNotExist`` for an unknown post.
+    """
+    with transaction.atomic():
+        like_count = ForumPost.objects.select_for_update().values_list('like_count', flat=True).get(pk=post_id)
+        deleted, _ = PostLike.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            return False, max(like_count - 1, 0)
+        # Bộ đếm like_count/likes_received do signal cập nhật bằng F()
+        PostLike.objects.create(user=user, post_id=post_id)
+        return True, like_count + 1
+
+
+def liked_post_ids(user, post_ids):
+    """The subset of ``post_ids`` that ``user`` has liked, in one query."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(PostLike.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True))
+
+
+def comment_page(post_id, after_id=None, limit=COMMENT_PAGE_SIZE):
+    """``(comments, next_after)``: up to ``limit`` comments after ``after_id``, oldest first.
+
+    Authors are joined in the same query; ``next_after`` is ``None`` on the last page.
+    """
+    comments = PostComment.objects.filter(post_id=post_id).select_related('author')
+    if after_id:
+        comments = comments.filter(id__gt=after_id)
+    comments = list(comments.order_by('id')[:limit + 1])
+    if len(comments) > limit:
+        comments = comments[:limit]
+        return comments, comments[-1].id
+    return comments, None
+
+
+def comment_json(comment, post_author_id):
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'is_post_author': comment.author_id == post_author_id,
+        'content': comment.content,
+        'content_html': comment.content_html,
+        'created_at': comment.created_at.isoformat(),
+        'timesince': timesince(comment.created_at),
+    }
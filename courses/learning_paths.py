@@ -0,0 +1,137 @@
+"""Provisioning of a course's shared ``LearningPath`` schedule and enrollments.
+
+Every student of a course follows the same ``LearningPath``. The first
+approved payment builds its weeks and daily tasks: the whole schedule is
+assembled in memory and written with two ``bulk_create`` calls, under a row
+lock on the ``LearningPath`` so concurrent approvals build it exactly once.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import DailyTask, LearningPath, LearningPathEnrollment, Lesson, WeeklySchedule
+
+DEFAULT_PATH = {
+    'total_weeks': 4,
+    'hours_per_week': 5,
+    'difficulty': 'beginner',
+}
+TASK_MINUTES = 60
+
+
+def _placeholder_task(week):
+    return DailyTask(
+        weekly_schedule=week,
+        day_number=1,
+        title=f'Bài học tuần {week.week_number}',
+        description='Nội dung học tập và video hướng dẫn',
+        duration_minutes=TASK_MINUTES,
+        resources='',
+    )
+
+
+def _lesson_task(week, day_number, lesson):
+    return DailyTask(
+        weekly_schedule=week,
+        day_number=day_number,
+        title=lesson.title,
+        description=f'Bài học: {lesson.title}',
+        duration_minutes=TASK_MINUTES,
+        resources=lesson.video_url or '',
+    )
+
+
+def build_schedule(learning_path):
+    """Create the weeks and daily tasks of an empty ``learning_path``; returns the task count."""
+    lessons = list(Lesson.objects.filter(course_id=learning_path.course_id).order_by('order'))
+    total_weeks = learning_path.total_weeks or DEFAULT_PATH['total_weeks']
+    weeks = WeeklySchedule.objects.bulk_create([
+        WeeklySchedule(
+            learning_path=learning_path,
+            week_number=number,
+            title=f'Tuần {number}',
+            objectives=f'Nội dung tuần {number}',
+            total_hours=learning_path.hours_per_week or DEFAULT_PATH['hours_per_week'],
+        )
+        for number in range(1, total_weeks + 1)
+    ])
+
+    if not lessons:
+        tasks = [_placeholder_task(week) for week in weeks]
+    else:
+        # Chia đều bài học theo tuần; các tuần đầu nhận thêm phần dư
+        per_week = max(1, len(lessons) // total_weeks)
+        extra = len(lessons) % total_weeks
+        tasks = []
+        start = 0
+        for week in weeks:
+            count = per_week + (1 if week.week_number <= extra else 0)
+            tasks.extend(
+                _lesson_task(week, day_number, lesson)
+                for day_number, lesson in enumerate(lessons[start:start + count], start=1)
+            )
+            start += count
+    DailyTask.objects.bulk_create(tasks)
+    return len(tasks)
+
+
+def provision_learning_path(course):
+    """The course's ``LearningPath``, created and scheduled on first use.
+
+    Idempotent: the path row is locked for the rest of the transaction, so a
+    concurrent approval waits and then finds the schedule already built.
+    """
+    with transaction.atomic():
+        learning_path, _ = LearningPath.objects.select_for_update().get_or_create(
+            course=course, defaults=DEFAULT_PATH,
+        )
+        if not WeeklySchedule.objects.filter(learning_path=learning_path).exists():
+            build_schedule(learning_path)
+    return learning_path
+
+
+def activate_enrollment(user, learning_path, assigned_by=None):
+    """Create ``user``'s enrollment in ``learning_path`` or reactivate an existing one."""
+    enrollment, created = LearningPathEnrollment.objects.get_or_create(
+        user=user,
+        learning_path=learning_path,
+        defaults={
+            'assigned_by': assigned_by,
+            'start_date': date.today(),
+            'status': 'active',
+        },
+    )
+    if not created:
+        enrollment.status = 'active'
+        if not enrollment.start_date:
+            enrollment.start_date = date.today()
+        if assigned_by is not None:
+            enrollment.assigned_by = assigned_by
+        enrollment.save()
+    return enrollment
+
+
+def activate_enrollments(pairs, assigned_by=None):
+    """Bulk ``activate_enrollment`` for ``(user_id, learning_path)`` pairs, in two statements."""
+    pairs = {(user_id, learning_path.pk) for user_id, learning_path in pairs}
+    if not pairs:
+        return 0
+    today = date.today()
+    LearningPathEnrollment.objects.bulk_create(
+        [
+            LearningPathEnrollment(
+                user_id=user_id, learning_path_id=path_id, assigned_by=assigned_by, start_date=today, status='active',
+            )
+            for user_id, path_id in pairs
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'learning_path'],
+        update_fields=['status', 'assigned_by'],
+    )
+    # Ghi danh cũ chưa có ngày bắt đầu: bắt đầu từ hôm nay như activate_enrollment
+    matches = Q()
+    for user_id, path_id in pairs:
+        matches |= Q(user_id=user_id, learning_path_id=path_id)
+    LearningPathEnrollment.objects.filter(matches, start_date__isnull=True).update(start_date=today)
+    return len(pairs)
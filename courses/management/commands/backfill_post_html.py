@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from courses.models import ForumPost, PostComment
+from courses.text import render_body_html
+
+BATCH_SIZE = 500
+
+
+def _chunks(queryset, batch_size):
+    """``queryset`` in primary-key order, ``batch_size`` rows at a time."""
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+class Command(BaseCommand):
+    help = 'Re-render the stored HTML, word count and reading time of forum posts and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Từng lô theo pk: bộ nhớ không phụ thuộc kích thước bảng
+        post_total = 0
+        for posts in _chunks(ForumPost.objects.only('id', 'content'), batch_size):
+            for post in posts:
+                post.render_content()
+            ForumPost.objects.bulk_update(posts, ['content_html', 'word_count', 'reading_time'])
+            post_total += len(posts)
+
+        comment_total = 0
+        for comments in _chunks(PostComment.objects.only('id', 'content'), batch_size):
+            for comment in comments:
+                comment.content_html = render_body_html(comment.content, links=False)
+            PostComment.objects.bulk_update(comments, ['content_html'])
+            comment_total += len(comments)
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {post_total} post(s) and {comment_total} comment(s).'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from courses.models import Course, ForumPost
+from courses.search import rebuild_course_index
+from courses.text import normalize_search_text
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Fill the accent-folded search columns of courses and forum posts, then rebuild the course index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        courses = list(Course.objects.only('id', 'title', 'description'))
+        for course in courses:
+            course.title_normalized = normalize_search_text(course.title)
+            course.description_normalized = normalize_search_text(course.description)
+        Course.objects.bulk_update(courses, ['title_normalized', 'description_normalized'], batch_size=batch_size)
+
+        posts = list(ForumPost.objects.only('id', 'title', 'content', 'tags'))
+        for post in posts:
+            post.search_text = post.build_search_text()
+        ForumPost.objects.bulk_update(posts, ['search_text'], batch_size=batch_size)
+
+        indexed = rebuild_course_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalized {len(courses)} course(s) and {len(posts)} post(s); indexed {indexed} course(s).'
+        ))
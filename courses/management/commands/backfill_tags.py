@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from courses.tags import backfill_post_tags
+
+
+class Command(BaseCommand):
+    help = 'Parse ForumPost.tags strings into Tag rows and links, then recount Tag.post_count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts, tags = backfill_post_tags(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Linked {posts} post(s) to {tags} tag(s).'))
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from courses.cache_log import cache_is_shared
+from courses.view_counter import FLUSH_BATCH_SIZE, flush_all_views
+
+
+class Command(BaseCommand):
+    help = 'Write buffered forum post views from the cache into ForumPost.views (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not settings.FORUM_BUFFER_VIEWS:
+            self.stdout.write('FORUM_BUFFER_VIEWS is off: views are written directly, nothing to flush.')
+            return
+        if not cache_is_shared():
+            # LocMem: bộ đếm nằm trong từng tiến trình web, lệnh này chỉ thấy cache rỗng của nó
+            raise CommandError(
+                'FORUM_BUFFER_VIEWS needs a cache shared by every process (set REDIS_URL); '
+                'the default cache is per-process, so the buffered views are out of reach here.'
+            )
+        written = flush_all_views(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {written} view(s).'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from courses.related import QUEUE_BATCH_SIZE, process_related_queue
+
+
+class Command(BaseCommand):
+    help = 'Recompute related posts for the forum posts queued since the last run (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=QUEUE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        updated = process_related_queue(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated related posts for {updated} post(s).'))
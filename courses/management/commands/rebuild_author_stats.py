@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from courses.stats import refresh_author_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute AuthorStats (posts, comments, likes received) from the forum tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Only rebuild these user ids')
+
+    def handle(self, *args, **options):
+        total = refresh_author_stats(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {total} user(s).'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from courses.stats import refresh_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute CourseStats (enrollments, reviews, lessons) from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Only rebuild these course ids')
+
+    def handle(self, *args, **options):
+        total = refresh_course_stats(options['course_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {total} course(s).'))
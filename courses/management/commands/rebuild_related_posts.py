@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from courses.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related-posts index (TF-IDF neighbours) for every forum post'
+
+    def handle(self, *args, **options):
+        total = rebuild_related_posts()
+        self.stdout.write(self.style.SUCCESS(f'Indexed related posts for {total} post(s).'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from courses.search import rebuild_course_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite FTS5 course search index (PostgreSQL maintains its own)'
+
+    def handle(self, *args, **options):
+        total = rebuild_course_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} course(s).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from courses.community import reconcile_community_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount the cached community totals (posts, comments, users, courses); run periodically from cron'
+
+    def handle(self, *args, **options):
+        stats = reconcile_community_stats()
+        summary = ', '.join(f'{value} {name}' for name, value in stats.items())
+        self.stdout.write(self.style.SUCCESS(f'Community stats: {summary}.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from courses.forum import refresh_post_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount ForumPost.like_count/comment_count from likes and comments, fixing any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('post_ids', nargs='*', type=int, help='Only these posts (default: all)')
+
+    def handle(self, *args, **options):
+        fixed = refresh_post_counters(options['post_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Fixed counters on {fixed} post(s).'))
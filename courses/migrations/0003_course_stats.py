@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    Payment = apps.get_model('courses', 'Payment')
+    Review = apps.get_model('courses', 'Review')
+    Lesson = apps.get_model('courses', 'Lesson')
+
+    enrollments = dict(Payment.objects.filter(status='completed').values_list('course_id').annotate(n=Count('id')).order_by())
+    lessons = dict(Lesson.objects.values_list('course_id').annotate(n=Count('id')).order_by())
+    reviews = {
+        row['course_id']: (row['n'], row['total'] or 0)
+        for row in Review.objects.values('course_id').annotate(n=Count('id'), total=Sum('rating')).order_by()
+    }
+    rows = []
+    for course_id in Course.objects.values_list('id', flat=True):
+        review_count, rating_sum = reviews.get(course_id, (0, 0))
+        rows.append(CourseStats(
+            course_id=course_id,
+            enrollment_count=enrollments.get(course_id, 0),
+            review_count=review_count,
+            rating_sum=rating_sum,
+            average_rating=(rating_sum / review_count) if review_count else 0,
+            lesson_count=lessons.get(course_id, 0),
+        ))
+    CourseStats.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_alter_payment_options_payment_approved_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('enrollment_count', models.PositiveIntegerField(default=0, verbose_name='Số học viên')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Số đánh giá')),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Tổng điểm đánh giá')),
+                ('average_rating', models.FloatField(default=0, verbose_name='Điểm trung bình')),
+                ('lesson_count', models.PositiveIntegerField(default=0, verbose_name='Số bài học')),
+            ],
+            options={
+                'verbose_name': 'Thống kê khóa học',
+                'verbose_name_plural': 'Thống kê khóa học',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-created_at'], name='course_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['price'], name='course_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['category', '-created_at'], name='course_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursestats',
+            index=models.Index(fields=['-enrollment_count'], name='coursestats_enroll_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursestats',
+            index=models.Index(fields=['-average_rating'], name='coursestats_rating_idx'),
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
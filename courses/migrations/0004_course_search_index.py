@@ -0,0 +1,44 @@
+from django.db import migrations
+
+FTS_TABLE = 'courses_course_fts'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, description)')
+            except Exception:
+                # SQLite built without FTS5: search falls back to icontains
+                return
+            cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, description) SELECT id, title, description FROM courses_course')
+        elif connection.vendor == 'postgresql':
+            # Generated column: PostgreSQL keeps it in sync on every write
+            cursor.execute(
+                "ALTER TABLE courses_course ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED"
+            )
+            cursor.execute('CREATE INDEX course_search_vector_idx ON courses_course USING GIN (search_vector)')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS course_search_vector_idx')
+            cursor.execute('ALTER TABLE courses_course DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
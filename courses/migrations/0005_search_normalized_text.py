@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+from courses.text import normalize_search_text
+
+
+def backfill_normalized_text(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    ForumPost = apps.get_model('courses', 'ForumPost')
+    courses = list(Course.objects.only('id', 'title', 'description'))
+    for course in courses:
+        course.title_normalized = normalize_search_text(course.title)
+        course.description_normalized = normalize_search_text(course.description)
+    Course.objects.bulk_update(courses, ['title_normalized', 'description_normalized'], batch_size=500)
+    posts = list(ForumPost.objects.only('id', 'title', 'content', 'tags'))
+    for post in posts:
+        post.search_text = normalize_search_text(' '.join(filter(None, [post.title, post.content, post.tags])))
+    ForumPost.objects.bulk_update(posts, ['search_text'], batch_size=500)
+
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'courses_course_fts'")
+        if cursor.fetchone() is None:
+            return
+        # Chỉ mục FTS5 chuyển sang văn bản không dấu
+        cursor.execute('DELETE FROM courses_course_fts')
+        cursor.executemany(
+            'INSERT INTO courses_course_fts (rowid, title, description) VALUES (%s, %s, %s)',
+            [(c.id, c.title_normalized, c.description_normalized) for c in courses],
+        )
+
+
+def create_normalized_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        # Full-text vector now reads the accent-folded columns
+        cursor.execute('DROP INDEX IF EXISTS course_search_vector_idx')
+        cursor.execute('ALTER TABLE courses_course DROP COLUMN IF EXISTS search_vector')
+        cursor.execute(
+            "ALTER TABLE courses_course ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title_normalized, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description_normalized, '')), 'B')) STORED"
+        )
+        cursor.execute('CREATE INDEX course_search_vector_idx ON courses_course USING GIN (search_vector)')
+        # Trigram indexes serve LIKE '%...%' on the normalized columns
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute('CREATE INDEX course_title_norm_trgm_idx ON courses_course USING GIN (title_normalized gin_trgm_ops)')
+        cursor.execute('CREATE INDEX forumpost_search_trgm_idx ON courses_forumpost USING GIN (search_text gin_trgm_ops)')
+
+
+def drop_normalized_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS forumpost_search_trgm_idx')
+        cursor.execute('DROP INDEX IF EXISTS course_title_norm_trgm_idx')
+        cursor.execute('DROP INDEX IF EXISTS course_search_vector_idx')
+        cursor.execute('ALTER TABLE courses_course DROP COLUMN IF EXISTS search_vector')
+        cursor.execute(
+            "ALTER TABLE courses_course ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED"
+        )
+        cursor.execute('CREATE INDEX course_search_vector_idx ON courses_course USING GIN (search_vector)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='description_normalized',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='title_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_normalized_text, migrations.RunPython.noop),
+        migrations.RunPython(create_normalized_indexes, drop_normalized_indexes),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+from collections import Counter
+
+from django.db import migrations, models
+
+from courses.text import split_tags
+
+
+def backfill_tags(apps, schema_editor):
+    ForumPost = apps.get_model('courses', 'ForumPost')
+    Tag = apps.get_model('courses', 'Tag')
+    parsed = {post_id: split_tags(tags) for post_id, tags in ForumPost.objects.values_list('id', 'tags')}
+    counts = Counter(name for names in parsed.values() for name in names)
+    Tag.objects.bulk_create([Tag(name=name, post_count=n) for name, n in counts.items()], batch_size=500)
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+    Link = ForumPost.tag_set.through
+    Link.objects.bulk_create(
+        [Link(forumpost_id=post_id, tag_id=tag_ids[name]) for post_id, names in parsed.items() for name in names],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_search_normalized_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Tên tag')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Số bài viết')),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['-post_count', 'name'], name='tag_popular_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='posts', to='courses.tag', verbose_name='Tags'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_forum_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['-is_pinned', '-created_at', '-id'], name='forumpost_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='forumpost_author_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    ForumPost = apps.get_model('courses', 'ForumPost')
+    PostLike = apps.get_model('courses', 'PostLike')
+    PostComment = apps.get_model('courses', 'PostComment')
+
+    def count_of(model):
+        counts = model.objects.filter(post=OuterRef('pk')).values('post').annotate(n=Count('id')).values('n')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    ForumPost.objects.update(like_count=count_of(PostLike), comment_count=count_of(PostComment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_forum_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số bình luận'),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Lượt thích'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['-is_pinned', '-like_count', '-created_at', '-id'], name='forumpost_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['-is_pinned', '-comment_count', '-created_at', '-id'], name='forumpost_discussed_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
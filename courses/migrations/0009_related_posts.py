@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_forum_post_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='courses.forumpost')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.forumpost')),
+            ],
+            options={
+                'verbose_name': 'Bài viết liên quan',
+                'verbose_name_plural': 'Bài viết liên quan',
+                'ordering': ['post', 'rank'],
+                'indexes': [models.Index(fields=['post', 'rank'], name='relatedpost_rank_idx')],
+                'unique_together': {('post', 'related')},
+            },
+        ),
+    ]
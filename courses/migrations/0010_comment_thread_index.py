@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_related_posts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['post', 'id'], name='postcomment_thread_idx'),
+        ),
+    ]
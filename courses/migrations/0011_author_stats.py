@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_author_stats(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    AuthorStats = apps.get_model('courses', 'AuthorStats')
+    ForumPost = apps.get_model('courses', 'ForumPost')
+    PostComment = apps.get_model('courses', 'PostComment')
+    PostLike = apps.get_model('courses', 'PostLike')
+
+    posts = dict(ForumPost.objects.values_list('author_id').annotate(n=Count('id')).order_by())
+    comments = dict(PostComment.objects.values_list('author_id').annotate(n=Count('id')).order_by())
+    likes = dict(PostLike.objects.values_list('post__author_id').annotate(n=Count('id')).order_by())
+    AuthorStats.objects.bulk_create([
+        AuthorStats(
+            user_id=user_id,
+            post_count=posts.get(user_id, 0),
+            comment_count=comments.get(user_id, 0),
+            likes_received=likes.get(user_id, 0),
+        )
+        for user_id in User.objects.values_list('id', flat=True)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('courses', '0010_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forum_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Số bài viết')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Số bình luận')),
+                ('likes_received', models.PositiveIntegerField(default=0, verbose_name='Lượt thích nhận được')),
+            ],
+            options={
+                'verbose_name': 'Thống kê thành viên',
+                'verbose_name_plural': 'Thống kê thành viên',
+            },
+        ),
+        migrations.RunPython(backfill_author_stats, migrations.RunPython.noop),
+    ]
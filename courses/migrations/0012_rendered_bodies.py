@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+from courses.text import reading_stats, render_body_html
+
+
+def backfill_rendered_bodies(apps, schema_editor):
+    ForumPost = apps.get_model('courses', 'ForumPost')
+    PostComment = apps.get_model('courses', 'PostComment')
+
+    posts = list(ForumPost.objects.only('id', 'content'))
+    for post in posts:
+        post.content_html = render_body_html(post.content)
+        post.word_count, post.reading_time = reading_stats(post.content)
+    ForumPost.objects.bulk_update(posts, ['content_html', 'word_count', 'reading_time'], batch_size=500)
+
+    comments = list(PostComment.objects.only('id', 'content'))
+    for comment in comments:
+        comment.content_html = render_body_html(comment.content, links=False)
+    PostComment.objects.bulk_update(comments, ['content_html'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_author_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Thời gian đọc (phút)'),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số từ'),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_rendered_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_rendered_bodies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPostUpdate',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='courses.forumpost')),
+                ('claim', models.CharField(blank=True, default='', max_length=32)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Bài viết chờ tính liên quan',
+                'verbose_name_plural': 'Bài viết chờ tính liên quan',
+            },
+        ),
+    ]
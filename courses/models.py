@@ -1,6 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .text import normalize_search_text, reading_stats, render_body_html
+
+
+def _with_shadow_fields(kwargs, sources, shadows):
+    # Khi save(update_fields=...) có trường nguồn, lưu luôn cột chuẩn hóa tương ứng
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) & set(sources):
+        kwargs['update_fields'] = set(update_fields) | set(shadows)
+    return kwargs
+
 # Tạo model Khóa học
 class Course(models.Model):
     title = models.CharField(max_length=200, verbose_name="Tên khóa học")
@@ -22,10 +32,27 @@ class Course(models.Model):
         default='other',
         verbose_name="Danh mục"
     )
+
+    # Bản không dấu, chữ thường của title/description để tìm kiếm không phân biệt dấu
+    title_normalized = models.CharField(max_length=200, blank=True, editable=False)
+    description_normalized = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='course_created_idx'),
+            models.Index(fields=['price'], name='course_price_idx'),
+            models.Index(fields=['category', '-created_at'], name='course_category_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.title_normalized = normalize_search_text(self.title)
+        self.description_normalized = normalize_search_text(self.description)
+        kwargs = _with_shadow_fields(kwargs, ('title', 'description'), ('title_normalized', 'description_normalized'))
+        super().save(*args, **kwargs)
+
 # Tạo model Bài học
 class Lesson(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="Khóa học")
@@ -38,6 +65,27 @@ class Lesson(models.Model):
     
     def __str__(self):
         return f"{self.course.title} - {self.title}"
+
+
+# Thống kê khóa học (cập nhật tăng dần qua signals, không cần GROUP BY khi hiển thị)
+class CourseStats(models.Model):
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    enrollment_count = models.PositiveIntegerField(default=0, verbose_name="Số học viên")
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Số đánh giá")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Tổng điểm đánh giá")
+    average_rating = models.FloatField(default=0, verbose_name="Điểm trung bình")
+    lesson_count = models.PositiveIntegerField(default=0, verbose_name="Số bài học")
+
+    class Meta:
+        verbose_name = "Thống kê khóa học"
+        verbose_name_plural = "Thống kê khóa học"
+        indexes = [
+            models.Index(fields=['-enrollment_count'], name='coursestats_enroll_idx'),
+            models.Index(fields=['-average_rating'], name='coursestats_rating_idx'),
+        ]
+
+    def __str__(self):
+        return f"Thống kê: {self.course_id}"
     
  # Tạo model Giỏ hàng   
 class Cart(models.Model):
@@ -125,6 +173,22 @@ class Wishlist(models.Model):
         unique_together = ('user', 'course')
 
 
+# Tag diễn đàn, liên kết nhiều-nhiều với bài viết
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="Tên tag")
+    # Số bài viết gắn tag, cập nhật bằng signal m2m_changed
+    post_count = models.PositiveIntegerField(default=0, verbose_name="Số bài viết")
+
+    class Meta:
+        ordering = ['name']
+        indexes = [models.Index(fields=['-post_count', 'name'], name='tag_popular_idx')]
+        verbose_name = "Tag"
+        verbose_name_plural = "Tags"
+
+    def __str__(self):
+        return self.name
+
+
 # Tạo model Bài viết diễn đàn
 class ForumPost(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Tác giả")
@@ -133,18 +197,77 @@ class ForumPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Ngày cập nhật")
     tags = models.CharField(max_length=100, blank=True, verbose_name="Tags")
+    # Dạng chuẩn hóa của `tags`, đồng bộ khi lưu bài viết (courses.tags)
+    tag_set = models.ManyToManyField(Tag, blank=True, related_name='posts', verbose_name="Tags")
     is_pinned = models.BooleanField(default=False, verbose_name="Ghim bài")
     is_featured = models.BooleanField(default=False, verbose_name="Nổi bật")
     views = models.PositiveIntegerField(default=0, verbose_name="Lượt xem")
+    # Bộ đếm phi chuẩn hóa, cập nhật bằng F() trong signal PostLike/PostComment
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Lượt thích")
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số bình luận")
+    # Tiêu đề + nội dung + tags không dấu, chữ thường (tìm kiếm không phân biệt dấu)
+    search_text = models.TextField(blank=True, editable=False)
+    # Nội dung dựng sẵn thành HTML đã escape khi lưu, cùng số từ và phút đọc
+    content_html = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số từ")
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, verbose_name="Thời gian đọc (phút)")
     
     class Meta:
         ordering = ['-is_pinned', '-created_at']
+        indexes = [
+            models.Index(fields=['-is_pinned', '-created_at', '-id'], name='forumpost_feed_idx'),
+            models.Index(fields=['-is_pinned', '-like_count', '-created_at', '-id'], name='forumpost_popular_idx'),
+            models.Index(fields=['-is_pinned', '-comment_count', '-created_at', '-id'], name='forumpost_discussed_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='forumpost_author_idx'),
+        ]
         verbose_name = "Bài viết diễn đàn"
         verbose_name_plural = "Bài viết diễn đàn"
     
     def __str__(self):
         return f"{self.title} - {self.author.username}"
 
+    def build_search_text(self):
+        return normalize_search_text(' '.join(filter(None, [self.title, self.content, self.tags])))
+
+    def render_content(self):
+        self.content_html = render_body_html(self.content)
+        self.word_count, self.reading_time = reading_stats(self.content)
+
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+        self.render_content()
+        kwargs = _with_shadow_fields(kwargs, ('title', 'content', 'tags'), ('search_text',))
+        kwargs = _with_shadow_fields(kwargs, ('content',), ('content_html', 'word_count', 'reading_time'))
+        super().save(*args, **kwargs)
+
+# Bài viết liên quan tính sẵn (top-k theo TF-IDF), xem courses/related.py
+class RelatedPost(models.Model):
+    post = models.ForeignKey(ForumPost, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(ForumPost, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['post', 'rank']
+        unique_together = ('post', 'related')
+        indexes = [models.Index(fields=['post', 'rank'], name='relatedpost_rank_idx')]
+        verbose_name = "Bài viết liên quan"
+        verbose_name_plural = "Bài viết liên quan"
+
+# Hàng đợi tính lại bài viết liên quan, process_related_posts (cron) xử lý
+class RelatedPostUpdate(models.Model):
+    # Không ràng buộc FK: pre_delete của một bài có thể xếp hàng bài khác bị xóa cùng lô
+    post = models.OneToOneField(
+        ForumPost, on_delete=models.CASCADE, primary_key=True, related_name='+', db_constraint=False,
+    )
+    # Lượt cron đang giữ hàng này; để trống khi chờ xử lý hoặc vừa được xếp lại
+    claim = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Bài viết chờ tính liên quan"
+        verbose_name_plural = "Bài viết chờ tính liên quan"
+
 class PostLike(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(ForumPost, on_delete=models.CASCADE)
@@ -161,14 +284,37 @@ class PostComment(models.Model):
     content = models.TextField(verbose_name="Nội dung")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Ngày cập nhật")
+    content_html = models.TextField(blank=True, editable=False)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'id'], name='postcomment_thread_idx'),
+        ]
         verbose_name = "Bình luận"
         verbose_name_plural = "Bình luận"
     
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
+
+    def save(self, *args, **kwargs):
+        self.content_html = render_body_html(self.content, links=False)
+        kwargs = _with_shadow_fields(kwargs, ('content',), ('content_html',))
+        super().save(*args, **kwargs)
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='forum_stats')
+    post_count = models.PositiveIntegerField(default=0, verbose_name="Số bài viết")
+    comment_count = models.PositiveIntegerField(default=0, verbose_name="Số bình luận")
+    likes_received = models.PositiveIntegerField(default=0, verbose_name="Lượt thích nhận được")
+
+    class Meta:
+        verbose_name = "Thống kê thành viên"
+        verbose_name_plural = "Thống kê thành viên"
+
+    def __str__(self):
+        return f"Thống kê: {self.user_id}"
     
 # Tạo model Lộ trình học tập
 class LearningPath(models.Model):
@@ -0,0 +1,96 @@
+"""Whole-response cache for anonymous catalog traffic.
+
+Anonymous visitors to the course list only differ by ``category``, ``sort``,
+``page`` and ``cursor``, so the rendered HTML is cached per combination of
+those parameters. Every key embeds a catalog version token; writes that
+change what the catalog shows (Course, Review, Payment status) replace the
+token via ``bump_catalog_version`` and all cached variants go stale at once.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+CATALOG_VERSION_KEY = 'catalog:version'
+HITS_KEY = 'catalog:page-cache:hits'
+MISSES_KEY = 'catalog:page-cache:misses'
+CACHED_PARAMS = ('category', 'sort', 'page', 'cursor')
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def page_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': (hits * 100 / total) if total else 0,
+    }
+
+
+def _cache_key(request):
+    params = '&'.join(f'{name}={request.GET.get(name, "")}' for name in CACHED_PARAMS)
+    digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+    return f'catalog:page:{catalog_version()}:{request.path}:{digest}'
+
+
+def _is_cacheable(request):
+    if request.method != 'GET' or request.user.is_authenticated:
+        return False
+    # Extra parameters would change the rendered page (e.g. ?next= links)
+    if any(name not in CACHED_PARAMS for name in request.GET):
+        return False
+    # Pending flash messages are rendered once, never cache them
+    return not len(messages.get_messages(request))
+
+
+def cache_anonymous_catalog(view):
+    """Serve anonymous GETs of ``view`` from the per-variant page cache."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view(request, *args, **kwargs)
+
+        key = _cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(HITS_KEY)
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+            patch_vary_headers(response, ('Cookie',))
+            return response
+
+        _count(MISSES_KEY)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+        response['X-Page-Cache'] = 'miss'
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,139 @@
+"""Keyset (cursor) pagination.
+
+Instead of ``OFFSET n`` plus a ``COUNT(*)``, each page is fetched with a
+``WHERE (sort columns) < (last row's values)`` condition, so page 1000 costs
+the same as page 1. Cursors are signed, opaque tokens carrying the sort key
+values of the boundary row and the direction to move in.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import F, Q
+
+
+def _resolve(obj, path):
+    for part in path.split('__'):
+        obj = getattr(obj, part, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """One page of results; iterable like a Django ``Page``."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by ``ordering`` (which must end in a unique field).
+
+    ``ordering`` uses ``order_by`` syntax, e.g. ``('-created_at', '-id')``.
+    ``salt`` namespaces the cursors so a token from one listing is rejected
+    by another.
+    """
+
+    def __init__(self, queryset, ordering, per_page, salt='keyset'):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.salt = salt
+        self.fields = [(f.lstrip('-'), f.startswith('-')) for f in self.ordering]
+
+    def cursor_for(self, obj, direction='next'):
+        values = [_encode(_resolve(obj, name)) for name, _ in self.fields]
+        return signing.dumps({'d': direction, 'v': values}, salt=self.salt, compress=True)
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature:
+            return None, None
+        values = data.get('v')
+        if data.get('d') not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.fields):
+            return None, None
+        return data['d'], values
+
+    def _order_by(self, backwards):
+        """ORDER BY for the walk; NULLs sort last going forward on every backend."""
+        order = []
+        for name, descending in self.fields:
+            expr = F(name).desc if descending != backwards else F(name).asc
+            order.append(expr(nulls_first=True) if backwards else expr(nulls_last=True))
+        return order
+
+    def _after(self, values, backwards):
+        """Rows strictly past ``values`` in sort order (before them if ``backwards``)."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            if value is None:
+                # Cột rỗng (vd. khóa học chưa có CourseStats): NULL đứng cuối khi đi tới,
+                # so sánh lt/gt với None sẽ lỗi nên tách riêng
+                past = Q(**{f'{name}__isnull': False}) if backwards else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                op = 'lt' if descending != backwards else 'gt'
+                past = Q(**{f'{name}__{op}': value})
+                if not backwards:
+                    past |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & past
+            equal &= same
+        return condition
+
+    def page(self, cursor=None):
+        direction, values = self._decode(cursor) if cursor else (None, None)
+        backwards = direction == 'prev'
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self._after(values, backwards))
+        qs = qs.order_by(*self._order_by(backwards))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+        more_forward = has_more if not backwards else True
+        more_backward = has_more if backwards else values is not None
+        return KeysetPage(
+            rows,
+            next_cursor=self.cursor_for(rows[-1], 'next') if more_forward else None,
+            previous_cursor=self.cursor_for(rows[0], 'prev') if more_backward else None,
+        )
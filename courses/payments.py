@@ -0,0 +1,99 @@
+"""Approval and rejection of pending payments, singly or in bulk.
+
+Payments are locked and updated with one ``UPDATE``; because that skips
+the ``Payment`` signal handlers, ``approve_payments`` applies their effects
+itself (``CourseStats.enrollment_count`` and the catalog version). Learning
+paths are provisioned once per course, enrollments are upserted in bulk and
+the confirmation emails go out over a single SMTP connection.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .learning_paths import activate_enrollments, provision_learning_path
+from .models import Payment
+from .page_cache import bump_catalog_version
+from .stats import bump_course_stats
+
+CONFIRMATION_SUBJECT = '✅ Thanh toán đã được xác nhận - Khóa học đã được kích hoạt'
+
+
+def _lock_pending(payment_ids):
+    return list(
+        Payment.objects.select_for_update(of=('self',))
+        .select_related('user', 'course')
+        .filter(id__in=payment_ids, status='pending')
+        .order_by('id')
+    )
+
+
+def approve_payments(payment_ids, approved_by):
+    """Approve the pending payments among ``payment_ids``; returns them, updated."""
+    with transaction.atomic():
+        payments = _lock_pending(payment_ids)
+        if not payments:
+            return []
+        now = timezone.now()
+        Payment.objects.filter(id__in=[p.id for p in payments]).update(
+            status='completed', approved_at=now, approved_by=approved_by,
+        )
+        for payment in payments:
+            payment.status, payment.approved_at, payment.approved_by = 'completed', now, approved_by
+
+        # update() không phát signal: tự cộng số học viên và đổi phiên bản catalog
+        for course_id, count in Counter(p.course_id for p in payments).items():
+            bump_course_stats(course_id, enrollment_count=count)
+        bump_catalog_version()
+
+        # Mỗi khóa học chỉ dựng lộ trình một lần cho cả lô
+        courses = {p.course_id: p.course for p in payments}
+        paths = {course_id: provision_learning_path(course) for course_id, course in courses.items()}
+        activate_enrollments([(p.user_id, paths[p.course_id]) for p in payments], assigned_by=approved_by)
+    return payments
+
+
+def reject_payments(payment_ids):
+    """Mark the pending payments among ``payment_ids`` as failed; returns how many."""
+    with transaction.atomic():
+        payments = _lock_pending(payment_ids)
+        if payments:
+            Payment.objects.filter(id__in=[p.id for p in payments]).update(status='failed')
+            bump_catalog_version()
+    return len(payments)
+
+
+def payment_confirmation_email(payment, course_list_url):
+    user, course = payment.user, payment.course
+    message = f'''
+Xin chào {user.get_full_name() or user.username}!
+
+Thanh toán của bạn cho khóa học "{course.title}" đã được xác nhận thành công.
+
+📚 THÔNG TIN KHÓA HỌC:
+• Tên khóa học: {course.title}
+• Số tiền: {payment.amount:,.0f} VNĐ
+• Phương thức: {payment.get_payment_method_display()}
+• Mã giao dịch: {payment.transaction_id or 'N/A'}
+• Thời gian xác nhận: {payment.approved_at.strftime('%d/%m/%Y %H:%M')}
+
+🎉 Khóa học đã được kích hoạt và sẵn sàng để bạn bắt đầu học!
+
+Bạn có thể truy cập khóa học tại: {course_list_url}
+
+Chúc bạn học tập hiệu quả!
+
+Trân trọng,
+Đội ngũ Học Lập Trình
+    '''
+    return EmailMessage(CONFIRMATION_SUBJECT, message.strip(), settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def send_payment_confirmations(payments, course_list_url):
+    """Email every approved payment's student over one connection; returns how many were sent."""
+    emails = [payment_confirmation_email(p, course_list_url) for p in payments if p.user.email]
+    if not emails:
+        return 0
+    return get_connection(fail_silently=True).send_messages(emails) or 0
@@ -0,0 +1,179 @@
+"""Content-based "related posts" for the forum.
+
+Each post is a TF-IDF vector over the words of its accent-folded
+``search_text`` plus its tags (weighted ``TAG_WEIGHT``); neighbours are
+ranked by cosine similarity and the top ``RELATED_LIMIT`` are stored as
+``RelatedPost`` rows, so ``forum_detail`` reads them in one query.
+
+Vectors are sparse dicts scored through an inverted index, which keeps the
+work proportional to shared terms rather than to posts x vocabulary.
+
+Building the corpus reads every post, so it never runs in a request:
+saving a post (or deleting one another post lists) only queues post ids
+as ``RelatedPostUpdate`` rows. The ``process_related_posts`` command, run
+from cron, claims the queued rows, builds one corpus per run, recomputes
+each claimed post's neighbours and patches the lists of posts it enters or
+leaves; IDF drift on the other posts is left for ``rebuild_related_posts``.
+
+Claiming is one ``UPDATE`` that stamps a token on unclaimed rows, so
+overlapping runs split the queue instead of both processing it. A post
+queued again while claimed is released (token cleared) and kept for the
+next run; claims older than ``CLAIM_TIMEOUT`` (a crashed run) are retaken.
+"""
+import heapq
+import math
+import re
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ForumPost, RelatedPost, RelatedPostUpdate
+from .text import split_tags
+
+RELATED_LIMIT = 5
+TAG_WEIGHT = 2.0
+MIN_SCORE = 0.05
+QUEUE_BATCH_SIZE = 500
+CLAIM_TIMEOUT = timedelta(minutes=30)
+_WORDS = re.compile(r'\w{2,}')
+
+
+def _term_counts(search_text, tags):
+    counts = Counter(_WORDS.findall(search_text or ''))
+    for tag in split_tags(tags):
+        counts[f'#{tag}'] += TAG_WEIGHT
+    return counts
+
+
+class Corpus:
+    """TF-IDF vectors and an inverted index for every post."""
+
+    def __init__(self):
+        rows = ForumPost.objects.values_list('id', 'search_text', 'tags')
+        counts = {post_id: _term_counts(text, tags) for post_id, text, tags in rows}
+        df = Counter(term for terms in counts.values() for term in terms)
+        total = len(counts)
+        idf = {term: math.log((total + 1) / (n + 1)) + 1 for term, n in df.items()}
+
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for post_id, terms in counts.items():
+            vector = {term: (1 + math.log(tf)) * idf[term] for term, tf in terms.items() if tf >= 1}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            vector = {term: w / norm for term, w in vector.items()}
+            self.vectors[post_id] = vector
+            for term, weight in vector.items():
+                self.postings[term].append((post_id, weight))
+
+    def similarities(self, post_id):
+        """``{other_id: cosine}`` for every post sharing a term with ``post_id``."""
+        scores = defaultdict(float)
+        for term, weight in self.vectors.get(post_id, {}).items():
+            for other_id, other_weight in self.postings[term]:
+                if other_id != post_id:
+                    scores[other_id] += weight * other_weight
+        return scores
+
+    def neighbours(self, post_id, scores=None):
+        """Top ``RELATED_LIMIT`` ``(other_id, score)``, best first."""
+        scores = self.similarities(post_id) if scores is None else scores
+        best = heapq.nlargest(RELATED_LIMIT, scores.items(), key=lambda item: (item[1], item[0]))
+        return [(other_id, score) for other_id, score in best if score >= MIN_SCORE]
+
+
+def _links(post_id, neighbours):
+    return [
+        RelatedPost(post_id=post_id, related_id=other_id, score=score, rank=rank)
+        for rank, (other_id, score) in enumerate(neighbours)
+    ]
+
+
+def rebuild_related_posts(batch_size=500):
+    """Recompute every post's neighbours; returns how many posts were indexed."""
+    corpus = Corpus()
+    links = [link for post_id in corpus.vectors for link in _links(post_id, corpus.neighbours(post_id))]
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(links, batch_size=batch_size)
+    return len(corpus.vectors)
+
+
+def _stored_lists(post_ids):
+    lists = defaultdict(list)
+    for post_id, related_id, score in RelatedPost.objects.filter(post_id__in=post_ids)\
+            .order_by('post_id', 'rank').values_list('post_id', 'related_id', 'score'):
+        lists[post_id].append((related_id, score))
+    return lists
+
+
+def _write_lists(lists):
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=list(lists)).delete()
+        RelatedPost.objects.bulk_create([link for post_id, ns in lists.items() for link in _links(post_id, ns)])
+
+
+def queue_related_update(post_ids):
+    """Mark posts whose neighbours must be recomputed by ``process_related_queue``."""
+    RelatedPostUpdate.objects.bulk_create(
+        [RelatedPostUpdate(post_id=post_id) for post_id in post_ids],
+        update_conflicts=True, unique_fields=['post'], update_fields=['claim', 'claimed_at'],
+    )
+
+
+def update_related_posts(post_id, corpus=None):
+    """Refresh ``post_id``'s neighbours and its place in other posts' lists."""
+    corpus = corpus or Corpus()
+    scores = corpus.similarities(post_id)
+    changed = {post_id: corpus.neighbours(post_id, scores)}
+
+    # Bài đang liệt kê post_id, hoặc giờ đủ điểm để chen vào danh sách của chúng
+    holders = set(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    candidates = holders | {other for other, score in scores.items() if score >= MIN_SCORE}
+    stored = _stored_lists(candidates)
+    for other_id in candidates:
+        current = [(rid, s) for rid, s in stored.get(other_id, []) if rid != post_id]
+        score = scores.get(other_id, 0.0)
+        if other_id in holders and current and score < current[-1][1]:
+            # Tụt xuống cuối danh sách: phần tử thứ k thật chưa biết, tính lại
+            changed[other_id] = corpus.neighbours(other_id)
+            continue
+        if score < MIN_SCORE:
+            changed[other_id] = current
+            continue
+        merged = sorted(current + [(post_id, score)], key=lambda item: (item[1], item[0]), reverse=True)
+        merged = merged[:RELATED_LIMIT]
+        if merged != stored.get(other_id, []):
+            changed[other_id] = merged
+    _write_lists(changed)
+
+
+def _claim_queue():
+    """Stamp a fresh token on every unclaimed (or abandoned) queued row; returns their post ids."""
+    token, now = uuid.uuid4().hex, timezone.now()
+    RelatedPostUpdate.objects.filter(Q(claim='') | Q(claimed_at__lt=now - CLAIM_TIMEOUT)).update(
+        claim=token, claimed_at=now,
+    )
+    return token, list(RelatedPostUpdate.objects.filter(claim=token).order_by('post_id').values_list('post_id', flat=True))
+
+
+def process_related_queue(batch_size=QUEUE_BATCH_SIZE):
+    """Update every queued post against one corpus; returns how many posts were updated."""
+    token, post_ids = _claim_queue()
+    if not post_ids:
+        return 0
+    corpus = Corpus()
+    updated = 0
+    for start in range(0, len(post_ids), batch_size):
+        batch = post_ids[start:start + batch_size]
+        # Bài đã bị xóa không còn trong corpus; danh sách chứa nó đã được xếp hàng riêng
+        for post_id in batch:
+            if post_id in corpus.vectors:
+                update_related_posts(post_id, corpus)
+                updated += 1
+        # Hàng được xếp lại trong lúc chạy đã bị xóa token: giữ cho lượt sau
+        RelatedPostUpdate.objects.filter(post_id__in=batch, claim=token).delete()
+    return updated
@@ -0,0 +1,120 @@
+"""Full-text search over course titles and descriptions.
+
+Backed by an FTS5 virtual table on SQLite and by a generated ``tsvector``
+column with a GIN index on PostgreSQL (both created in migration 0004).
+On SQLite the index is kept in sync by the Course signal handlers; the
+PostgreSQL column is maintained by the database itself. Other backends, or
+a SQLite build without FTS5, fall back to substring matching.
+
+Both the index and the query use the accent-folded text from
+``normalize_search_text``, so "lap trinh" finds "Lập Trình".
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Course
+from .text import normalize_search_text
+
+FTS_TABLE = 'courses_course_fts'
+SEARCH_LIMIT = 500
+
+# bm25 weights: a title hit ranks well above a description hit
+_SQLITE_SEARCH = (
+    f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+    f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s'
+)
+_POSTGRES_SEARCH = (
+    "SELECT id FROM courses_course, to_tsquery('simple', %s) query "
+    'WHERE search_vector @@ query '
+    'ORDER BY ts_rank(search_vector, query) DESC, id DESC LIMIT %s'
+)
+
+_fts_ready = {}
+
+
+def _tokens(query):
+    return re.findall(r'\w+', normalize_search_text(query))
+
+
+def _sqlite_has_fts():
+    if 'sqlite' not in _fts_ready:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_ready['sqlite'] = cursor.fetchone() is not None
+    return _fts_ready['sqlite']
+
+
+def search_course_ids(query, limit=SEARCH_LIMIT):
+    """Course ids matching every word of ``query`` (as a prefix), best first.
+
+    Returns ``None`` when no full-text index is available.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    if connection.vendor == 'sqlite' and _sqlite_has_fts():
+        # Quote each token so user input can never be parsed as FTS5 syntax
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        sql = _SQLITE_SEARCH
+    elif connection.vendor == 'postgresql':
+        match = ' & '.join(f'{token}:*' for token in tokens)
+        sql = _POSTGRES_SEARCH
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_courses_ranked(query, queryset=None, limit=SEARCH_LIMIT, ordering=None):
+    """Courses matching ``query``, at most ``limit`` of them.
+
+    Ordered by relevance, or by ``ordering`` when given (the ``limit`` best
+    matches are picked first, then re-sorted).
+    """
+    courses = queryset if queryset is not None else Course.objects.all()
+    ids = search_course_ids(query, limit)
+    if ids is None:
+        folded = normalize_search_text(query)
+        ids = list(
+            courses.filter(Q(title_normalized__contains=folded) | Q(description_normalized__contains=folded))
+            .order_by('-created_at').values_list('id', flat=True)[:limit]
+        )
+    if not ids:
+        return courses.none()
+    courses = courses.filter(id__in=ids)
+    if ordering:
+        return courses.order_by(*ordering)
+    rank = Case(*[When(id=course_id, then=pos) for pos, course_id in enumerate(ids)], output_field=IntegerField())
+    return courses.annotate(search_rank=rank).order_by('search_rank', 'id')
+
+
+def index_course(course):
+    if connection.vendor != 'sqlite' or not _sqlite_has_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+            [course.pk, course.title_normalized, course.description_normalized],
+        )
+
+
+def unindex_course(course_id):
+    if connection.vendor != 'sqlite' or not _sqlite_has_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course_id])
+
+
+def rebuild_course_index():
+    """Re-index every course; returns how many were indexed (0 if not SQLite FTS)."""
+    if connection.vendor != 'sqlite' or not _sqlite_has_fts():
+        return 0
+    rows = list(Course.objects.values_list('id', 'title_normalized', 'description_normalized'))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)', rows)
+    return len(rows)
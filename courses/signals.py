@@ -1,8 +1,23 @@
 from django.conf import settings
+from django.db import transaction
 from django.contrib.auth import login as auth_login
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
 from allauth.account import signals
 from django.dispatch import receiver
 
+from .models import AuthorStats, Course, CourseStats, ForumPost, Lesson, Payment, PostComment, PostLike, RelatedPost, Review, Tag
+from .stats import bump_author_stats, bump_course_stats, bump_post_author_stats
+from .catalog import invalidate_category_counts
+from .page_cache import bump_catalog_version
+from .search import index_course, unindex_course
+from .suggest import suggest_index
+from .tags import bump_tag_counts, sync_post_tags, tag_counts_changed
+from .forum import bump_post_counters
+from .related import queue_related_update
+from .events import activity_bus, bump_activity_version, comment_event, post_event
+from .community import bump_community_stat
+
 
 @receiver(signals.email_confirmed)
 def email_confirmed_auto_login(sender, request, email_address, **kwargs):
@@ -26,3 +41,305 @@ def email_confirmed_auto_login(sender, request, email_address, **kwargs):
     except Exception:
         # best effort for dev; ignore failures
         pass
+
+
+# --------------------------------------------------
+# CourseStats: cập nhật bộ đếm khi dữ liệu nguồn thay đổi
+# --------------------------------------------------
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, **kwargs):
+    if created:
+        CourseStats.objects.get_or_create(course=instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_facets_changed(sender, instance, **kwargs):
+    invalidate_category_counts()
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Course)
+def course_search_index_on_save(sender, instance, **kwargs):
+    index_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def course_search_index_on_delete(sender, instance, **kwargs):
+    unindex_course(instance.pk)
+    course_id = instance.pk
+    transaction.on_commit(lambda: suggest_index.course_deleted(course_id))
+
+
+@receiver(post_save, sender=Course)
+def course_suggest_on_save(sender, instance, **kwargs):
+    # Chỉ vá chỉ mục gợi ý (bộ nhớ tiến trình) khi giao dịch đã commit, rollback thì bỏ
+    course_id, title = instance.pk, instance.title
+    transaction.on_commit(lambda: suggest_index.course_saved(course_id, title))
+
+
+# --------------------------------------------------
+# Tags diễn đàn: đồng bộ Tag/post_count và chỉ mục gợi ý
+# --------------------------------------------------
+@receiver(post_init, sender=ForumPost)
+def remember_post_tags(sender, instance, **kwargs):
+    instance._loaded_tags = instance.__dict__.get('tags')
+    instance._loaded_search_text = instance.__dict__.get('search_text')
+
+
+@receiver(post_save, sender=ForumPost)
+def post_tags_on_save(sender, instance, created, **kwargs):
+    old_tags = '' if created else instance._loaded_tags
+    if old_tags is None:
+        # tags bị defer khi load nên không biết giá trị cũ: dựng lại chỉ mục
+        transaction.on_commit(suggest_index.invalidate)
+        sync_post_tags(instance)
+    elif old_tags != instance.tags:
+        new_tags = instance.tags
+        transaction.on_commit(lambda: suggest_index.tags_changed(old_tags, new_tags))
+        sync_post_tags(instance)
+    instance._loaded_tags = instance.tags
+
+
+@receiver(post_save, sender=ForumPost)
+def related_posts_on_save(sender, instance, created, **kwargs):
+    # search_text gom tiêu đề + nội dung + tags: chỉ tính lại khi nó đổi.
+    # Chỉ xếp hàng; process_related_posts (cron) dựng corpus ngoài request
+    if created or instance._loaded_search_text != instance.search_text:
+        queue_related_update([instance.pk])
+    instance._loaded_search_text = instance.search_text
+
+
+@receiver(pre_delete, sender=ForumPost)
+def related_posts_on_delete(sender, instance, **kwargs):
+    # Liên kết tới bài này bị xóa theo cascade; các danh sách chứa nó cần bù chỗ trống
+    queue_related_update(RelatedPost.objects.filter(related_id=instance.pk).values_list('post_id', flat=True))
+
+
+@receiver(pre_delete, sender=ForumPost)
+def post_tags_on_delete(sender, instance, **kwargs):
+    # Bảng liên kết bị xóa theo cascade, không phát m2m_changed
+    tag_ids = list(instance.tag_set.values_list('pk', flat=True))
+    bump_tag_counts(tag_ids, -1)
+    tag_counts_changed(tag_ids)
+    old_tags = instance._loaded_tags
+    if old_tags is None:
+        transaction.on_commit(suggest_index.invalidate)
+    else:
+        transaction.on_commit(lambda: suggest_index.tags_changed(old_tags, ''))
+
+
+@receiver(m2m_changed, sender=ForumPost.tag_set.through)
+def tag_post_count_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            tag_ids = [instance.pk]
+            Tag.objects.filter(pk=instance.pk).update(post_count=0)
+        else:
+            tag_ids = list(instance.tag_set.values_list('pk', flat=True))
+            bump_tag_counts(tag_ids, -1)
+        tag_counts_changed(tag_ids)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        # tag.posts.add(...): instance là Tag, pk_set là các bài viết
+        tag_ids = [instance.pk]
+        bump_tag_counts(tag_ids, sign * len(pk_set))
+    else:
+        tag_ids = list(pk_set)
+        bump_tag_counts(tag_ids, sign)
+    tag_counts_changed(tag_ids)
+
+
+# --------------------------------------------------
+# Luồng hoạt động diễn đàn (SSE / long-poll), phát sau khi commit
+# --------------------------------------------------
+@receiver(post_save, sender=ForumPost)
+def publish_new_post(sender, instance, created, **kwargs):
+    if created:
+        event = post_event(instance)
+        transaction.on_commit(lambda: activity_bus.publish(event))
+
+
+@receiver(post_save, sender=PostComment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    if created:
+        event = comment_event(instance)
+        transaction.on_commit(lambda: activity_bus.publish(event))
+
+
+@receiver(post_init, sender=ForumPost)
+def remember_post_title(sender, instance, **kwargs):
+    instance._loaded_title = instance.__dict__.get('title')
+
+
+@receiver(post_save, sender=ForumPost)
+def activity_version_on_post_edit(sender, instance, created, **kwargs):
+    # Luồng hoạt động chỉ hiện tiêu đề bài viết; title bị defer thì coi như đã đổi
+    if not created and (instance._loaded_title is None or instance._loaded_title != instance.title):
+        transaction.on_commit(bump_activity_version)
+    instance._loaded_title = instance.title
+
+
+@receiver(post_save, sender=PostComment)
+def activity_version_on_comment_edit(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(bump_activity_version)
+
+
+@receiver(post_delete, sender=ForumPost)
+@receiver(post_delete, sender=PostComment)
+def activity_version_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(bump_activity_version)
+
+
+# --------------------------------------------------
+# Bộ đếm like/bình luận của bài viết diễn đàn
+# --------------------------------------------------
+@receiver(post_save, sender=PostLike)
+def post_like_count_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_post_counters(instance.post_id, like_count=1)
+
+
+@receiver(post_delete, sender=PostLike)
+def post_like_count_on_delete(sender, instance, **kwargs):
+    bump_post_counters(instance.post_id, like_count=-1)
+
+
+@receiver(post_save, sender=PostComment)
+def post_comment_count_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_post_counters(instance.post_id, comment_count=1)
+
+
+@receiver(post_delete, sender=PostComment)
+def post_comment_count_on_delete(sender, instance, **kwargs):
+    bump_post_counters(instance.post_id, comment_count=-1)
+
+
+# --------------------------------------------------
+# Tổng số liệu cộng đồng trong cache (courses.community), cập nhật sau commit
+# --------------------------------------------------
+_COMMUNITY_COUNTERS = {ForumPost: 'posts', PostComment: 'comments', User: 'users', Course: 'courses'}
+
+
+@receiver(post_save, sender=ForumPost)
+@receiver(post_save, sender=PostComment)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Course)
+def community_stats_on_save(sender, instance, created, **kwargs):
+    if created:
+        name = _COMMUNITY_COUNTERS[sender]
+        transaction.on_commit(lambda: bump_community_stat(name, 1))
+
+
+@receiver(post_delete, sender=ForumPost)
+@receiver(post_delete, sender=PostComment)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Course)
+def community_stats_on_delete(sender, instance, **kwargs):
+    name = _COMMUNITY_COUNTERS[sender]
+    transaction.on_commit(lambda: bump_community_stat(name, -1))
+
+
+# --------------------------------------------------
+# AuthorStats: bài viết, bình luận và lượt thích nhận được của từng thành viên
+# --------------------------------------------------
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=ForumPost)
+def author_post_count_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_author_stats(instance.author_id, post_count=1)
+
+
+@receiver(post_delete, sender=ForumPost)
+def author_post_count_on_delete(sender, instance, **kwargs):
+    bump_author_stats(instance.author_id, post_count=-1)
+
+
+@receiver(post_save, sender=PostComment)
+def author_comment_count_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_author_stats(instance.author_id, comment_count=1)
+
+
+@receiver(post_delete, sender=PostComment)
+def author_comment_count_on_delete(sender, instance, **kwargs):
+    bump_author_stats(instance.author_id, comment_count=-1)
+
+
+@receiver(post_save, sender=PostLike)
+def author_likes_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_post_author_stats(instance.post_id, likes_received=1)
+
+
+@receiver(post_delete, sender=PostLike)
+def author_likes_on_delete(sender, instance, **kwargs):
+    # Khi xóa bài viết, like bị xóa theo cascade trước bài viết nên vẫn tìm được tác giả
+    bump_post_author_stats(instance.post_id, likes_received=-1)
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields never trigger a query
+    instance._stats_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Payment)
+def payment_stats_on_save(sender, instance, created, **kwargs):
+    was_completed = not created and instance._stats_status == 'completed'
+    is_completed = instance.status == 'completed'
+    bump_course_stats(instance.course_id, enrollment_count=int(is_completed) - int(was_completed))
+    if (created and is_completed) or (not created and instance._stats_status != instance.status):
+        bump_catalog_version()
+    instance._stats_status = instance.status
+
+
+@receiver(post_delete, sender=Payment)
+def payment_stats_on_delete(sender, instance, **kwargs):
+    if instance._stats_status == 'completed':
+        bump_course_stats(instance.course_id, enrollment_count=-1)
+        bump_catalog_version()
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._stats_rating = instance.__dict__.get('rating')
+
+
+@receiver(post_save, sender=Review)
+def review_stats_on_save(sender, instance, created, **kwargs):
+    # Views pass request.POST values straight through, so rating may be a str
+    rating = int(instance.rating)
+    if created:
+        bump_course_stats(instance.course_id, review_count=1, rating_sum=rating)
+    elif instance._stats_rating is not None:
+        bump_course_stats(instance.course_id, rating_sum=rating - int(instance._stats_rating))
+    instance._stats_rating = rating
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Review)
+def review_stats_on_delete(sender, instance, **kwargs):
+    bump_course_stats(instance.course_id, review_count=-1, rating_sum=-int(instance._stats_rating or instance.rating))
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_stats_on_save(sender, instance, created, **kwargs):
+    if created:
+        bump_course_stats(instance.course_id, lesson_count=1)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_stats_on_delete(sender, instance, **kwargs):
+    bump_course_stats(instance.course_id, lesson_count=-1)
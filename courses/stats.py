@@ -0,0 +1,145 @@
+"""Incremental maintenance of the denormalized ``CourseStats`` and ``AuthorStats`` rows.
+
+Counters are adjusted with single ``UPDATE ... SET col = col + n`` statements
+from the signal handlers in ``signals.py``. ``refresh_course_stats`` and
+``refresh_author_stats`` rebuild rows from the source tables; the
+``rebuild_course_stats`` / ``rebuild_author_stats`` commands use them to
+repair drift.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Subquery, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import AuthorStats, Course, CourseStats, ForumPost, Lesson, Payment, PostComment, PostLike, Review
+
+STAT_FIELDS = ('enrollment_count', 'review_count', 'rating_sum', 'average_rating', 'lesson_count')
+AUTHOR_STAT_FIELDS = ('post_count', 'comment_count', 'likes_received')
+
+
+def bump_course_stats(course_id, **deltas):
+    """Apply counter deltas (e.g. ``enrollment_count=1``) to one course.
+
+    Missing rows are left alone; ``rebuild_course_stats`` recreates them.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        updated = CourseStats.objects.filter(course_id=course_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if updated and ('review_count' in deltas or 'rating_sum' in deltas):
+            # Second statement sees the new totals, so the average is exact
+            CourseStats.objects.filter(course_id=course_id).update(average_rating=Case(
+                When(review_count=0, then=Value(0.0)),
+                default=Cast(F('rating_sum'), FloatField()) / Cast(F('review_count'), FloatField()),
+                output_field=FloatField(),
+            ))
+
+
+def refresh_course_stats(course_ids=None):
+    """Recompute stats rows from Payment/Review/Lesson with grouped queries.
+
+    Returns the number of rows written.
+    """
+    courses = Course.objects.all()
+    payments = Payment.objects.filter(status='completed')
+    reviews = Review.objects.all()
+    lessons = Lesson.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+        payments = payments.filter(course_id__in=course_ids)
+        reviews = reviews.filter(course_id__in=course_ids)
+        lessons = lessons.filter(course_id__in=course_ids)
+
+    enrollments = dict(payments.values_list('course_id').annotate(n=Count('id')).order_by())
+    lesson_counts = dict(lessons.values_list('course_id').annotate(n=Count('id')).order_by())
+    review_totals = {
+        row['course_id']: (row['n'], row['total'] or 0)
+        for row in reviews.values('course_id').annotate(n=Count('id'), total=Sum('rating')).order_by()
+    }
+
+    rows = []
+    for course_id in courses.values_list('id', flat=True):
+        review_count, rating_sum = review_totals.get(course_id, (0, 0))
+        rows.append(CourseStats(
+            course_id=course_id,
+            enrollment_count=enrollments.get(course_id, 0),
+            review_count=review_count,
+            rating_sum=rating_sum,
+            average_rating=(rating_sum / review_count) if review_count else 0,
+            lesson_count=lesson_counts.get(course_id, 0),
+        ))
+
+    CourseStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['course'],
+        update_fields=list(STAT_FIELDS),
+    )
+    return len(rows)
+
+
+def _bump_author_rows(rows, deltas):
+    for field, delta in deltas.items():
+        if not delta:
+            continue
+        target = rows.filter(**{f'{field}__gte': -delta}) if delta < 0 else rows
+        target.update(**{field: F(field) + delta})
+
+
+def bump_author_stats(user_id, **deltas):
+    """Apply counter deltas (e.g. ``comment_count=1``) to one user's row, never below zero.
+
+    Missing rows are left alone; ``rebuild_author_stats`` recreates them.
+    """
+    _bump_author_rows(AuthorStats.objects.filter(user_id=user_id), deltas)
+
+
+def bump_post_author_stats(post_id, **deltas):
+    """``bump_author_stats`` for the author of ``post_id``, in one statement."""
+    author = ForumPost.objects.filter(pk=post_id).values('author_id')
+    _bump_author_rows(AuthorStats.objects.filter(user_id=Subquery(author)), deltas)
+
+
+def author_stats(user):
+    """``user``'s row, or an unsaved all-zero one if it has not been built yet."""
+    try:
+        return user.forum_stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def refresh_author_stats(user_ids=None):
+    """Recompute ``AuthorStats`` rows from posts, comments and likes; returns rows written."""
+    users = User.objects.all()
+    posts = ForumPost.objects.all()
+    comments = PostComment.objects.all()
+    likes = PostLike.objects.all()
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+        posts = posts.filter(author_id__in=user_ids)
+        comments = comments.filter(author_id__in=user_ids)
+        likes = likes.filter(post__author_id__in=user_ids)
+
+    post_counts = dict(posts.values_list('author_id').annotate(n=Count('id')).order_by())
+    comment_counts = dict(comments.values_list('author_id').annotate(n=Count('id')).order_by())
+    like_counts = dict(likes.values_list('post__author_id').annotate(n=Count('id')).order_by())
+
+    rows = [
+        AuthorStats(
+            user_id=user_id,
+            post_count=post_counts.get(user_id, 0),
+            comment_count=comment_counts.get(user_id, 0),
+            likes_received=like_counts.get(user_id, 0),
+        )
+        for user_id in users.values_list('id', flat=True)
+    ]
+    AuthorStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=list(AUTHOR_STAT_FIELDS),
+    )
+    return len(rows)
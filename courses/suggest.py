@@ -0,0 +1,204 @@
+"""In-process prefix index for the search box typeahead.
+
+Every course title and forum tag is stored under its accent-folded form
+(``normalize_search_text``) in a sorted list, once per word, so a prefix
+lookup is two ``bisect`` calls and never touches the database. The index
+is built on first use and then patched by the Course/ForumPost signal
+handlers. Each worker process keeps its own copy, so it is also rebuilt
+after ``SUGGEST_MAX_AGE`` seconds to pick up writes made by other workers.
+
+Rebuilds run in a background thread into a fresh snapshot that is swapped
+in when ready; patches arriving meanwhile are replayed onto it. Requests
+keep answering from the current snapshot, so only the very first lookup
+in a process waits for a build.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.db import connection
+
+from .text import normalize_search_text, split_tags
+
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_AGE = 60 * 5
+# Ký tự lớn nhất của Unicode: khóa + _HIGH là cận trên của mọi chuỗi có cùng tiền tố
+_HIGH = '\U0010ffff'
+
+
+def _suffixes(text):
+    words = normalize_search_text(text).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words))} - {''}
+
+
+class PrefixIndex:
+    """Sorted ``(key, item)`` entries answering "all items whose key starts with p"."""
+
+    def __init__(self, items=()):
+        """Index ``(item, text)`` pairs, sorting the entries once."""
+        self._entries = []
+        self._keys = {}
+        for item, text in items:
+            keys = self._keys[item] = _suffixes(text)
+            self._entries.extend((key, item) for key in keys)
+        self._entries.sort()
+
+    def add(self, item, text):
+        """Index ``item`` under every word suffix of ``text``."""
+        self.remove(item)
+        keys = _suffixes(text)
+        for key in keys:
+            insort(self._entries, (key, item))
+        self._keys[item] = keys
+
+    def remove(self, item):
+        for key in self._keys.pop(item, ()):
+            pos = bisect_left(self._entries, (key, item))
+            if pos < len(self._entries) and self._entries[pos] == (key, item):
+                del self._entries[pos]
+
+    def search(self, prefix):
+        """Items with a key starting with ``prefix``, each item once, in key order."""
+        entries = self._entries
+        start = bisect_left(entries, (prefix,))
+        end = bisect_left(entries, (prefix + _HIGH,), start)
+        seen = {}
+        for key, item in entries[start:end]:
+            seen.setdefault(item, key)
+        return seen
+
+
+class _Snapshot:
+    """Course titles and tag counts as loaded by one build, plus later patches."""
+
+    def __init__(self):
+        from .models import Course, Tag
+
+        rows = list(Course.objects.values_list('id', 'title'))
+        self.courses = {course_id: (title, normalize_search_text(title)) for course_id, title in rows}
+        self.titles = PrefixIndex(rows)
+        self.tag_counts = Counter(dict(Tag.objects.filter(post_count__gt=0).values_list('name', 'post_count')))
+        self.tags = PrefixIndex((tag, tag) for tag in self.tag_counts)
+        self.built_at = time.monotonic()
+
+    def put_course(self, course_id, title):
+        self.courses[course_id] = (title, normalize_search_text(title))
+        self.titles.add(course_id, title)
+
+    def remove_course(self, course_id):
+        self.courses.pop(course_id, None)
+        self.titles.remove(course_id)
+
+    def move_tags(self, old_tags, new_tags):
+        for tag in split_tags(old_tags):
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+                self.tags.remove(tag)
+        for tag in split_tags(new_tags):
+            if tag not in self.tag_counts:
+                self.tags.add(tag, tag)
+            self.tag_counts[tag] += 1
+
+
+class SuggestIndex:
+    def __init__(self):
+        # _lock bảo vệ snapshot và danh sách patch; _build_lock: mỗi lúc một lần build
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._snapshot = None
+        self._patches = None
+        self._stale = False
+        self._refreshing = False
+
+    def _rebuild(self, if_missing=False):
+        with self._build_lock:
+            if if_missing and self._snapshot is not None:
+                # Một request khác vừa build xong trong lúc chờ khóa
+                return
+            with self._lock:
+                self._patches = []
+            snapshot = None
+            try:
+                snapshot = _Snapshot()
+            finally:
+                with self._lock:
+                    if snapshot is not None:
+                        # Ghi nhận trong lúc build: áp lại lên bản mới rồi mới thay
+                        for patch in self._patches:
+                            patch(snapshot)
+                        self._snapshot = snapshot
+                        self._stale = False
+                    self._patches = None
+                    self._refreshing = False
+
+    def _refresh_in_background(self):
+        try:
+            self._rebuild()
+        finally:
+            connection.close()
+
+    def _start_refresh(self):
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Chỉ lần tra cứu đầu tiên của tiến trình phải chờ build
+            self._rebuild(if_missing=True)
+            return self._snapshot
+        if self._stale or time.monotonic() - snapshot.built_at > SUGGEST_MAX_AGE:
+            with self._lock:
+                start, self._refreshing = not self._refreshing, True
+            if start:
+                self._start_refresh()
+        return snapshot
+
+    def _apply(self, patch):
+        with self._lock:
+            if self._snapshot is not None:
+                patch(self._snapshot)
+            if self._patches is not None:
+                self._patches.append(patch)
+
+    def invalidate(self):
+        """Refresh from the database in the background on the next lookup."""
+        self._stale = True
+
+    def reset(self):
+        """Drop the index; the next lookup builds it synchronously."""
+        with self._lock:
+            self._snapshot = None
+            self._stale = False
+
+    def course_saved(self, course_id, title):
+        self._apply(lambda snapshot: snapshot.put_course(course_id, title))
+
+    def course_deleted(self, course_id):
+        self._apply(lambda snapshot: snapshot.remove_course(course_id))
+
+    def tags_changed(self, old_tags, new_tags):
+        """Move one post's tag counts from ``old_tags`` to ``new_tags``."""
+        self._apply(lambda snapshot: snapshot.move_tags(old_tags, new_tags))
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        prefix = normalize_search_text(query)
+        if not prefix:
+            return {'courses': [], 'tags': []}
+        snapshot = self._current()
+        with self._lock:
+            title_hits = snapshot.titles.search(prefix)
+            tag_hits = snapshot.tags.search(prefix)
+            # Khớp từ đầu tiêu đề xếp trước, sau đó tiêu đề ngắn hơn
+            course_ids = sorted(
+                title_hits,
+                key=lambda cid: (not snapshot.courses[cid][1].startswith(prefix), len(snapshot.courses[cid][1]), cid),
+            )[:limit]
+            courses = [{'id': cid, 'title': snapshot.courses[cid][0]} for cid in course_ids]
+            tags = sorted(tag_hits, key=lambda tag: (-snapshot.tag_counts[tag], tag))[:limit]
+            tags = [{'tag': tag, 'count': snapshot.tag_counts[tag]} for tag in tags]
+        return {'courses': courses, 'tags': tags}
+
+
+suggest_index = SuggestIndex()
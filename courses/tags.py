@@ -0,0 +1,131 @@
+"""Keep ``ForumPost.tag_set`` in step with the free-form ``ForumPost.tags`` text.
+
+Posts are still written with a tags string; on save it is parsed with
+``split_tags`` and mirrored onto ``Tag`` rows, so tag filters are an
+indexed join instead of ``icontains`` over every post. ``Tag.post_count``
+is maintained by the ``m2m_changed`` handler in ``signals``.
+
+The sidebar's popular tags come from a cached top list (``POPULAR_TAGS_KEEP``
+entries, twice as many as shown) that the same handlers patch with each
+changed tag's new count, so the sidebar never scans posts or tags.
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count, F
+
+from .models import ForumPost, Tag
+from .text import split_tags
+
+POPULAR_TAG_LIMIT = 20
+POPULAR_TAGS_KEEP = POPULAR_TAG_LIMIT * 2
+POPULAR_TAGS_KEY = 'forum:popular-tags'
+# Hết hạn để tự sửa nếu hai tiến trình ghi đè cập nhật của nhau
+POPULAR_TAGS_TIMEOUT = 60 * 10
+
+PopularTag = namedtuple('PopularTag', ['name', 'post_count'])
+
+
+def get_or_create_tags(names):
+    """``Tag`` rows for ``names`` (creating missing ones), in two queries."""
+    if not names:
+        return []
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return list(Tag.objects.filter(name__in=names))
+
+
+def sync_post_tags(post):
+    """Point ``post.tag_set`` at the tags parsed from ``post.tags``."""
+    post.tag_set.set(get_or_create_tags(split_tags(post.tags)))
+
+
+def bump_tag_counts(tag_ids, delta):
+    """Add ``delta`` to ``post_count`` of ``tag_ids``, never below zero."""
+    if not delta:
+        return
+    tags = Tag.objects.filter(pk__in=tag_ids)
+    if delta < 0:
+        # Đếm lệch (sửa tay, refresh_tag_counts chạy dở) thì bỏ qua thay vì vi phạm CHECK >= 0
+        tags = tags.filter(post_count__gte=-delta)
+    tags.update(post_count=F('post_count') + delta)
+
+
+def refresh_tag_counts():
+    """Recompute every ``Tag.post_count`` from the link table."""
+    tags = list(Tag.objects.annotate(n=Count('posts')))
+    for tag in tags:
+        tag.post_count = tag.n
+    Tag.objects.bulk_update(tags, ['post_count'], batch_size=500)
+    return len(tags)
+
+
+def backfill_post_tags(batch_size=500):
+    """Parse every post's tags string into ``Tag`` links; returns (posts, tags)."""
+    parsed = {post_id: split_tags(tags) for post_id, tags in ForumPost.objects.values_list('id', 'tags')}
+    tags = {tag.name: tag.pk for tag in get_or_create_tags(sorted({n for names in parsed.values() for n in names}))}
+    Link = ForumPost.tag_set.through
+    Link.objects.all().delete()
+    Link.objects.bulk_create(
+        [Link(forumpost_id=post_id, tag_id=tags[name]) for post_id, names in parsed.items() for name in names],
+        batch_size=batch_size,
+    )
+    total = refresh_tag_counts()
+    cache.delete(POPULAR_TAGS_KEY)
+    return len(parsed), total
+
+
+def _rank(entry):
+    name, count = entry
+    return (-count, name)
+
+
+def _build_popular_tags():
+    rows = list(
+        Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')
+        .values_list('name', 'post_count')[:POPULAR_TAGS_KEEP]
+    )
+    # complete: không còn tag nào ngoài danh sách
+    return {'tags': rows, 'complete': len(rows) < POPULAR_TAGS_KEEP}
+
+
+def popular_forum_tags(limit=POPULAR_TAG_LIMIT):
+    """Most used tags as ``PopularTag(name, post_count)``, from the cached top list."""
+    popular = cache.get(POPULAR_TAGS_KEY)
+    if popular is None:
+        popular = _build_popular_tags()
+        cache.set(POPULAR_TAGS_KEY, popular, POPULAR_TAGS_TIMEOUT)
+    return [PopularTag(*entry) for entry in popular['tags'][:limit]]
+
+
+def _merge_popular_tags(popular, updates):
+    """Apply ``(name, post_count)`` updates; ``None`` if the list can't stay exact."""
+    entries = dict(popular['tags'])
+    complete = popular['complete']
+    if not complete and not entries:
+        return None
+    # Mọi tag ngoài danh sách đều xếp sau phần tử cuối
+    tail = _rank(popular['tags'][-1]) if popular['tags'] else None
+    for name, count in updates:
+        entries.pop(name, None)
+        if count > 0 and (complete or _rank((name, count)) <= tail):
+            entries[name] = count
+    ranked = sorted(entries.items(), key=_rank)
+    if len(ranked) > POPULAR_TAGS_KEEP:
+        ranked = ranked[:POPULAR_TAGS_KEEP]
+        complete = False
+    if not complete and len(ranked) < POPULAR_TAG_LIMIT:
+        return None
+    return {'tags': ranked, 'complete': complete}
+
+
+def tag_counts_changed(tag_ids):
+    """Patch the cached popular list after ``post_count`` changed for ``tag_ids``."""
+    popular = cache.get(POPULAR_TAGS_KEY)
+    if popular is None or not tag_ids:
+        return
+    updates = Tag.objects.filter(pk__in=tag_ids).values_list('name', 'post_count')
+    popular = _merge_popular_tags(popular, updates)
+    if popular is None:
+        cache.delete(POPULAR_TAGS_KEY)
+    else:
+        cache.set(POPULAR_TAGS_KEY, popular, POPULAR_TAGS_TIMEOUT)
@@ -1,7 +1,36 @@
 from django.test import TestCase, Client
+import asyncio
+import json
+from io import StringIO
+import threading
+from unittest import mock
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Course, LearningPath, WeeklySchedule, DailyTask, LearningPathEnrollment
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from .models import (
+	Cart, Course, CourseStats, ForumPost, LearningPath, Lesson, PostComment, PostLike, RelatedPostUpdate, Tag, WeeklySchedule, DailyTask, LearningPathEnrollment, Payment, Review
+)
+from .stats import refresh_author_stats, refresh_course_stats
+from .page_cache import page_cache_stats
+from .cache_log import CacheLog
+from .search import search_course_ids
+from . import suggest as suggest_module
+from .suggest import suggest_index
+from .tags import backfill_post_tags, popular_forum_tags
+from .forum import FORUM_PAGE_SIZE, refresh_post_counters
+from . import view_counter
+from .view_counter import VIEW_FLUSH_THRESHOLD, flush_all_views, flush_post_views, pending_views, record_view
+from . import related as related_module
+from .related import process_related_queue, rebuild_related_posts
+from .events import activity_bus
+from .community import community_stats, reconcile_community_stats
+from .learning_paths import provision_learning_path
+from django.core import mail
+from django.core.management import CommandError, call_command
+from .catalog import SORT_ORDERINGS, catalog_paginator, catalog_queryset, category_counts
 from datetime import date
 
 
@@ -51,3 +80,940 @@ class LearningPathScheduleTests(TestCase):
 		self.client.login(username='staff', password='pass')
 		resp = self.client.get(reverse('my_schedule', args=[enroll.id]))
 		self.assertEqual(resp.status_code, 200)
+
+
+class LearningPathProvisioningTests(TestCase):
+	def setUp(self):
+		self.course = Course.objects.create(title='Django', description='d', price=100)
+		for order in range(1, 11):
+			Lesson.objects.create(course=self.course, title=f'L{order}', video_url='https://v.example/x', order=order)
+
+	def test_schedule_is_built_once_with_bulk_inserts(self):
+		# get_or_create + exists + lessons + 2 bulk_create (cộng savepoint), không phụ thuộc số bài học
+		with self.assertNumQueries(10):
+			lp = provision_learning_path(self.course)
+		self.assertEqual(provision_learning_path(self.course), lp)
+		weeks = list(lp.weeks.prefetch_related('days'))
+		self.assertEqual([w.week_number for w in weeks], [1, 2, 3, 4])
+		self.assertEqual([len(w.days.all()) for w in weeks], [3, 3, 2, 2])
+		self.assertEqual([d.title for d in weeks[0].days.all()], ['L1', 'L2', 'L3'])
+
+	def test_admin_approval_enrolls_student(self):
+		User = get_user_model()
+		student = User.objects.create_user(username='student', password='pass')
+		User.objects.create_user(username='staff', password='pass', is_staff=True)
+		payment = Payment.objects.create(user=student, course=self.course, amount=100, status='pending')
+		self.client.login(username='staff', password='pass')
+		self.client.post(reverse('admin_approve_payment', args=[payment.id]))
+		enrollment = LearningPathEnrollment.objects.get(user=student)
+		self.assertEqual(enrollment.status, 'active')
+		self.assertEqual(DailyTask.objects.filter(weekly_schedule__learning_path=enrollment.learning_path).count(), 10)
+
+
+class BulkPaymentApprovalTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		User.objects.create_user(username='staff', password='pass', is_staff=True)
+		self.courses = [Course.objects.create(title=f'C{i}', description='d', price=100) for i in range(2)]
+		self.payments = []
+		for i in range(6):
+			student = User.objects.create_user(username=f's{i}', password='pass', email=f's{i}@example.com')
+			self.payments.append(Payment.objects.create(
+				user=student, course=self.courses[i % 2], amount=100, payment_method='momo', status='pending',
+			))
+		self.client.login(username='staff', password='pass')
+
+	def test_bulk_approve_provisions_enrolls_and_emails_once_per_payment(self):
+		ids = [str(p.id) for p in self.payments[:4]]
+		self.client.post(reverse('admin_bulk_payments'), {'action': 'approve', 'payment_ids': ids})
+		self.assertEqual(Payment.objects.filter(status='completed').count(), 4)
+		self.assertEqual(LearningPath.objects.count(), 2)
+		self.assertEqual(LearningPathEnrollment.objects.filter(status='active').count(), 4)
+		self.assertEqual(len(mail.outbox), 4)
+		# update() bỏ qua signal nhưng số học viên vẫn đúng
+		self.assertEqual([c.stats.enrollment_count for c in Course.objects.select_related('stats').order_by('id')], [2, 2])
+
+		# Duyệt lại không nhân đôi; từ chối phần còn lại
+		self.client.post(reverse('admin_bulk_payments'), {'action': 'approve', 'payment_ids': ids})
+		self.assertEqual(len(mail.outbox), 4)
+		self.client.post(reverse('admin_bulk_payments'), {'action': 'reject', 'payment_ids': [str(p.id) for p in self.payments]})
+		self.assertEqual(Payment.objects.filter(status='failed').count(), 2)
+
+	def test_single_approve_reports_when_nothing_was_approved(self):
+		url = reverse('admin_approve_payment', args=[self.payments[0].id])
+		resp = self.client.post(url, follow=True)
+		self.assertEqual([m.level_tag for m in resp.context['messages']], ['success'])
+		self.assertEqual(len(mail.outbox), 1)
+
+		# Đã duyệt rồi (vd. hai admin bấm cùng lúc): cảnh báo, không báo thành công
+		resp = self.client.post(url, follow=True)
+		self.assertEqual([m.level_tag for m in resp.context['messages']], ['warning'])
+		self.assertEqual(len(mail.outbox), 1)
+
+
+class CourseStatsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.user = User.objects.create_user(username='buyer', password='pass')
+		self.other = User.objects.create_user(username='buyer2', password='pass')
+		self.course = Course.objects.create(title='Stats Course', description='desc', price=100)
+
+	def test_counters_follow_payments_and_reviews(self):
+		payment = Payment.objects.create(user=self.user, course=self.course, amount=100, payment_method='momo')
+		self.assertEqual(CourseStats.objects.get(course=self.course).enrollment_count, 0)
+		payment.status = 'completed'
+		payment.save()
+		Payment.objects.create(user=self.other, course=self.course, amount=100, payment_method='cod', status='completed')
+
+		Review.objects.create(user=self.user, course=self.course, rating='4', comment='ok')
+		review = Review.objects.create(user=self.other, course=self.course, rating=5, comment='great')
+		stats = CourseStats.objects.get(course=self.course)
+		self.assertEqual((stats.enrollment_count, stats.review_count, stats.rating_sum), (2, 2, 9))
+		self.assertAlmostEqual(stats.average_rating, 4.5)
+
+		review.delete()
+		payment.delete()
+		stats.refresh_from_db()
+		self.assertEqual((stats.enrollment_count, stats.review_count), (1, 1))
+		self.assertAlmostEqual(stats.average_rating, 4.0)
+
+		# Drift is repaired by the rebuild helper
+		CourseStats.objects.filter(course=self.course).update(enrollment_count=7)
+		refresh_course_stats()
+		stats.refresh_from_db()
+		self.assertEqual(stats.enrollment_count, 1)
+
+	def test_popular_sort_uses_stats(self):
+		popular = Course.objects.create(title='Popular', description='desc', price=50)
+		Payment.objects.create(user=self.user, course=popular, amount=50, payment_method='cod', status='completed')
+		resp = self.client.get(reverse('course_list'), {'sort': 'popular'})
+		self.assertEqual([c.id for c in resp.context['courses']][:2], [popular.id, self.course.id])
+
+
+class CategoryFacetTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		Course.objects.create(title='Py', description='d', price=1, category='python')
+		Course.objects.create(title='Other', description='d', price=1, category='other')
+
+	def test_counts_cover_all_choices_and_are_cached(self):
+		with self.assertNumQueries(1):
+			counts = category_counts()
+		self.assertEqual(set(counts), {value for value, _ in Course.CATEGORY_CHOICES} | {'all'})
+		self.assertEqual((counts['python'], counts['other'], counts['web'], counts['all']), (1, 1, 0, 2))
+		with self.assertNumQueries(0):
+			category_counts()
+
+		Course.objects.create(title='Web', description='d', price=1, category='web')
+		self.assertEqual(category_counts()['web'], 1)
+
+
+class CatalogKeysetPaginationTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		buyer = get_user_model().objects.create_user(username='buyer', password='pass')
+		for i in range(20):
+			course = Course.objects.create(title=f'C{i}', description='d', price=(i % 4) * 100)
+			if i % 3 == 0:
+				Payment.objects.create(user=buyer, course=course, amount=1, payment_method='cod', status='completed')
+
+	def test_cursor_walk_matches_full_ordering_for_every_sort(self):
+		for sort in SORT_ORDERINGS:
+			expected = list(catalog_queryset('', sort).values_list('id', flat=True))
+			paginator = catalog_paginator(catalog_queryset('', sort), sort)
+			seen, page = [], paginator.page()
+			while True:
+				seen.extend(c.id for c in page)
+				if not page.has_next:
+					break
+				last_page = page
+				page = paginator.page(page.next_cursor)
+			self.assertEqual(seen, expected, sort)
+			# Walking back one page returns the previous page exactly
+			back = paginator.page(page.previous_cursor)
+			self.assertEqual([c.id for c in back], [c.id for c in last_page], sort)
+
+	def test_courses_without_stats_row_page_cleanly(self):
+		# Khóa học chưa có CourseStats: khóa sắp xếp là NULL, cursor mang giá trị None
+		CourseStats.objects.filter(course__title__in=[f'C{i}' for i in range(5, 20, 2)]).delete()
+		for sort in ('popular', 'rating'):
+			paginator = catalog_paginator(catalog_queryset('', sort), sort)
+			seen, page = [], paginator.page()
+			while True:
+				seen.extend(c.id for c in page)
+				if not page.has_next:
+					break
+				last_page = page
+				page = paginator.page(page.next_cursor)
+			self.assertEqual(sorted(seen), sorted(Course.objects.values_list('id', flat=True)), sort)
+			self.assertEqual(len(seen), len(set(seen)), sort)
+			back = paginator.page(page.previous_cursor)
+			self.assertEqual([c.id for c in back], [c.id for c in last_page], sort)
+
+	def test_home_cursor_mode(self):
+		resp = self.client.get(reverse('course_list'), {'sort': 'popular'})
+		cursor = resp.context['next_cursor']
+		self.assertTrue(cursor)
+		resp = self.client.get(reverse('course_list'), {'sort': 'popular', 'cursor': cursor})
+		self.assertEqual(len(resp.context['courses']), 9)
+		self.assertTrue(resp.context['courses'].has_previous)
+		# A tampered cursor falls back to the first page
+		resp = self.client.get(reverse('course_list'), {'cursor': 'garbage'})
+		self.assertEqual(resp.status_code, 200)
+
+
+class AnonymousCatalogCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = get_user_model().objects.create_user(username='reader', password='pass')
+		self.course = Course.objects.create(title='Cached', description='d', price=10)
+
+	def test_anonymous_variants_are_cached_until_a_write(self):
+		url = reverse('course_list')
+		self.assertEqual(self.client.get(url, {'sort': 'rating'})['X-Page-Cache'], 'miss')
+		self.assertEqual(self.client.get(url, {'sort': 'rating'})['X-Page-Cache'], 'hit')
+		self.assertEqual(self.client.get(url, {'sort': 'newest'})['X-Page-Cache'], 'miss')
+		self.assertEqual(page_cache_stats()['hits'], 1)
+
+		Review.objects.create(user=self.user, course=self.course, rating=3, comment='ok')
+		self.assertEqual(self.client.get(url, {'sort': 'rating'})['X-Page-Cache'], 'miss')
+
+		# Unknown parameters and logged-in users bypass the cache entirely
+		self.assertFalse(self.client.get(url, {'utm': 'x'}).has_header('X-Page-Cache'))
+		self.client.login(username='reader', password='pass')
+		self.assertFalse(self.client.get(url, {'sort': 'rating'}).has_header('X-Page-Cache'))
+
+
+class CatalogApiTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		for i in range(12):
+			Course.objects.create(title=f'Api {i}', description='word ' * 30, price=1000 * i, category='web' if i % 2 else 'data')
+
+	def test_json_pages_follow_home_semantics(self):
+		url = reverse('course_catalog_api')
+		data = self.client.get(url, {'category': 'web', 'sort': 'price_desc'}).json()
+		self.assertEqual(data['total'], 6)
+		self.assertEqual([c['price_display'] for c in data['courses'][:2]], ['11.000', '9.000'])
+		self.assertIsNone(data['next_cursor'])
+
+		first = self.client.get(url).json()
+		self.assertEqual(len(first['courses']), 9)
+		rest = self.client.get(url, {'cursor': first['next_cursor']}).json()
+		self.assertEqual(len(rest['courses']), 3)
+		self.assertTrue({'id', 'title', 'detail_url', 'enrollment_count'} <= set(first['courses'][0]))
+
+		numbered = self.client.get(url, {'page': 2}).json()
+		self.assertEqual((numbered['page'], numbered['num_pages']), (2, 2))
+
+	def test_etag_revalidation(self):
+		url = reverse('course_catalog_api')
+		resp = self.client.get(url)
+		etag = resp['ETag']
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+		Course.objects.create(title='New', description='d', price=1)
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class UserCourseStateTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = get_user_model().objects.create_user(username='shopper', password='pass')
+		self.owned = Course.objects.create(title='Owned', description='d', price=1)
+		self.carted = Course.objects.create(title='Carted', description='d', price=1)
+		Payment.objects.create(user=self.user, course=self.owned, amount=1, payment_method='cod', status='completed')
+		Cart.objects.create(user=self.user, course=self.carted)
+		self.client.login(username='shopper', password='pass')
+
+	def _home_queries(self):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(reverse('course_list'))
+		return resp, len(ctx.captured_queries)
+
+	def test_card_state_costs_no_query_per_course(self):
+		resp, small = self._home_queries()
+		state = resp.context['course_state']
+		self.assertEqual((state.accessible, state.in_cart), ({self.owned.id}, {self.carted.id}))
+		self.assertContains(resp, reverse('learning_path', args=[self.owned.id]))
+
+		for i in range(7):
+			Course.objects.create(title=f'Extra {i}', description='d', price=1)
+		_, large = self._home_queries()
+		self.assertEqual(small, large)
+
+	def test_api_reports_flags(self):
+		cards = {c['id']: c for c in self.client.get(reverse('course_catalog_api')).json()['courses']}
+		self.assertTrue(cards[self.owned.id]['owned'])
+		self.assertTrue(cards[self.carted.id]['in_cart'])
+		self.assertFalse(cards[self.carted.id]['wishlisted'])
+
+
+class CourseFullTextSearchTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.in_title = Course.objects.create(title='Django REST framework', description='Xây dựng API', price=1)
+		self.in_body = Course.objects.create(title='Web nâng cao', description='Dùng Django và React', price=1)
+		Course.objects.create(title='Pandas', description='Phân tích dữ liệu', price=1)
+
+	def test_ranked_prefix_search_stays_in_sync(self):
+		self.assertEqual(search_course_ids('djan'), [self.in_title.id, self.in_body.id])
+		self.assertEqual(search_course_ids('django react'), [self.in_body.id])
+		# FTS5 operators in user input are treated as plain words
+		self.assertEqual(search_course_ids('django OR "'), [])
+
+		self.in_body.description = 'Chỉ React'
+		self.in_body.save()
+		self.in_title.delete()
+		self.assertEqual(search_course_ids('django'), [])
+
+		resp = self.client.get(reverse('search'), {'q': 'react'})
+		self.assertEqual([c.id for c in resp.context['courses']], [self.in_body.id])
+
+	def test_search_ignores_vietnamese_accents(self):
+		course = Course.objects.create(title='Lập Trình Cơ Bản', description='Học từ đầu', price=1)
+		self.assertEqual(search_course_ids('lap trinh co ban'), [course.id])
+		self.assertEqual(search_course_ids('LẬP trình'), [course.id])
+
+		author = get_user_model().objects.create_user(username='writer', password='pass')
+		post = ForumPost.objects.create(author=author, title='Hỏi về Lập Trình Cơ Bản', content='Đề bài tuần 1')
+		ForumPost.objects.create(author=author, title='Pandas', content='Dữ liệu')
+		resp = self.client.get(reverse('forum_list'), {'q': 'lap trinh co ban'})
+		self.assertEqual([p.id for p in resp.context['posts']], [post.id])
+		resp = self.client.get(reverse('forum_list'), {'q': 'de bai'})
+		self.assertEqual([p.id for p in resp.context['posts']], [post.id])
+
+
+	def test_results_are_paginated_filtered_and_sorted(self):
+		for i in range(12):
+			Course.objects.create(title=f'Django nâng cao {i}', description='', price=100 + i, category='django')
+		resp = self.client.get(reverse('search'), {'q': 'django', 'category': 'django', 'sort': 'price_desc'})
+		page = resp.context['page_obj']
+		self.assertEqual(page.paginator.count, 12)
+		self.assertEqual([c.price for c in page][:2], [111, 110])
+		self.assertEqual(len(page), 9)
+
+		# Số truy vấn không phụ thuộc số khóa học trên trang
+		with CaptureQueriesContext(connection) as ctx:
+			self.client.get(reverse('search'), {'q': 'django', 'page': 2})
+		with self.assertNumQueries(len(ctx)):
+			self.client.get(reverse('search'), {'q': 'django'})
+
+		resp = self.client.get(reverse('search'))
+		self.assertEqual(resp.context['sort'], 'newest')
+		self.assertEqual(resp.context['page_obj'].paginator.count, 15)
+
+
+class SearchSuggestTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		suggest_index.reset()
+		self.basic = Course.objects.create(title='Lập Trình Cơ Bản', description='', price=1)
+		self.web = Course.objects.create(title='Lập trình Web với Django', description='', price=1)
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+		self.post = ForumPost.objects.create(author=self.author, title='A', content='B', tags='python django')
+		ForumPost.objects.create(author=self.author, title='C', content='D', tags='python')
+
+	def suggest(self, q):
+		return self.client.get(reverse('search_suggest'), {'q': q}).json()
+
+	def test_prefix_lookup_without_queries(self):
+		self.suggest('x')  # dựng chỉ mục
+		with self.assertNumQueries(0):
+			data = self.suggest('lap tr')
+		self.assertEqual([c['id'] for c in data['courses']], [self.basic.id, self.web.id])
+		# Khớp ở giữa tiêu đề, không dấu
+		self.assertEqual([c['id'] for c in self.suggest('co b')['courses']], [self.basic.id])
+		self.assertEqual(self.suggest('py')['tags'], [{'tag': 'python', 'count': 2, 'url': reverse('forum_tag', args=['python'])}])
+
+	def test_index_follows_writes(self):
+		self.suggest('x')
+		self.web.title = 'Flask thực chiến'
+		with self.captureOnCommitCallbacks(execute=True):
+			self.web.save()
+			self.basic.delete()
+		self.assertEqual(self.suggest('lap')['courses'], [])
+		self.assertEqual([c['id'] for c in self.suggest('thuc')['courses']], [self.web.id])
+
+		self.post.tags = 'flask'
+		with self.captureOnCommitCallbacks(execute=True):
+			self.post.save()
+		self.assertEqual([t['tag'] for t in self.suggest('dj')['tags']], [])
+		self.assertEqual([(t['tag'], t['count']) for t in self.suggest('f')['tags']], [('flask', 1)])
+		with self.captureOnCommitCallbacks(execute=True):
+			self.post.delete()
+		self.assertEqual(self.suggest('fl')['tags'], [])
+
+	def test_rolled_back_writes_do_not_reach_the_index(self):
+		self.suggest('x')
+		with self.assertRaises(RuntimeError), transaction.atomic():
+			self.web.title = 'Flask thực chiến'
+			self.web.save()
+			self.post.tags = 'flask'
+			self.post.save()
+			raise RuntimeError
+		self.assertEqual(self.suggest('thuc')['courses'], [])
+		self.assertEqual(self.suggest('fl')['tags'], [])
+		self.assertEqual(len(self.suggest('lap')['courses']), 2)
+
+	def test_stale_index_refreshes_in_background(self):
+		self.suggest('x')
+		suggest_index.invalidate()
+		with mock.patch.object(suggest_index, '_start_refresh') as start_refresh:
+			# Vẫn trả lời từ bản hiện tại, không build trong request
+			with self.assertNumQueries(0):
+				self.assertEqual(len(self.suggest('lap')['courses']), 2)
+			self.suggest('lap')
+		start_refresh.assert_called_once_with()
+
+		# Thay đổi đến trong lúc build được áp lại lên bản mới trước khi thay
+		build = suggest_module._Snapshot
+		def build_with_concurrent_write():
+			snapshot = build()
+			suggest_index.course_saved(999, 'Lập trình Rust')
+			return snapshot
+		with mock.patch.object(suggest_module, '_Snapshot', side_effect=build_with_concurrent_write):
+			suggest_index._rebuild()
+		self.assertIn(999, [c['id'] for c in self.suggest('lap')['courses']])
+
+
+class ForumTagTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+		self.py = ForumPost.objects.create(author=self.author, title='A', content='x', tags='Python, django')
+		self.np = ForumPost.objects.create(author=self.author, title='B', content='x', tags='numpy python')
+
+	def counts(self):
+		return dict(Tag.objects.values_list('name', 'post_count'))
+
+	def test_tag_filter_is_exact_and_counts_follow_writes(self):
+		self.assertEqual(self.counts(), {'python': 2, 'django': 1, 'numpy': 1})
+		resp = self.client.get(reverse('forum_tag', args=['py']))
+		self.assertEqual(list(resp.context['posts']), [])
+		resp = self.client.get(reverse('forum_list'), {'tag': 'numpy'})
+		self.assertEqual([p.id for p in resp.context['posts']], [self.np.id])
+		self.assertEqual([t.name for t in resp.context['popular_tags']], ['python', 'django', 'numpy'])
+
+		self.py.tags = 'django flask'
+		self.py.save()
+		self.np.delete()
+		self.assertEqual(self.counts(), {'python': 0, 'django': 1, 'numpy': 0, 'flask': 1})
+
+	def test_drifted_count_is_not_pushed_below_zero(self):
+		Tag.objects.filter(name='numpy').update(post_count=0)
+		self.np.tags = 'python'
+		self.np.save()
+		self.py.delete()
+		self.assertEqual(self.counts(), {'python': 1, 'django': 0, 'numpy': 0})
+
+	def test_backfill_rebuilds_links_from_tag_strings(self):
+		ForumPost.objects.filter(pk=self.np.pk).update(tags='numpy pandas')
+		self.assertEqual(backfill_post_tags(), (2, 4))
+		self.assertEqual(self.counts(), {'python': 1, 'django': 1, 'numpy': 1, 'pandas': 1})
+		self.assertEqual(sorted(self.np.tag_set.values_list('name', flat=True)), ['numpy', 'pandas'])
+
+	def test_popular_tags_are_cached_and_patched_in_place(self):
+		self.assertEqual(popular_forum_tags(), [('python', 2), ('django', 1), ('numpy', 1)])
+		with self.assertNumQueries(0):
+			popular_forum_tags()
+
+		ForumPost.objects.create(author=self.author, title='C', content='x', tags='django pandas')
+		self.np.delete()
+		with self.assertNumQueries(0):
+			self.assertEqual(popular_forum_tags(), [('django', 2), ('pandas', 1), ('python', 1)])
+
+
+class ForumPaginationTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+		self.posts = [
+			ForumPost.objects.create(author=self.author, title=f'Bài {i}', content='x', tags='python')
+			for i in range(FORUM_PAGE_SIZE + 5)
+		]
+		self.pinned = self.posts[0]
+		self.pinned.is_pinned = True
+		self.pinned.save()
+
+	def test_new_sort_walks_cursor_pages_with_pinned_first(self):
+		resp = self.client.get(reverse('forum_list'))
+		first = resp.context['posts']
+		self.assertEqual(len(first), FORUM_PAGE_SIZE)
+		self.assertEqual(first.object_list[0], self.pinned)
+		self.assertFalse(first.has_previous)
+
+		resp = self.client.get(reverse('forum_tag', args=['python']), {'cursor': first.next_cursor})
+		second = resp.context['posts']
+		self.assertEqual(len(second), 5)
+		seen = [p.id for p in first] + [p.id for p in second]
+		self.assertEqual(sorted(seen), sorted(p.id for p in self.posts))
+		self.assertIn('cursor=', resp.content.decode())
+
+	def test_count_sorts_and_profile_are_paginated(self):
+		resp = self.client.get(reverse('forum_list'), {'sort': 'comments', 'page': 2})
+		self.assertEqual(resp.context['posts'].number, 2)
+		self.assertEqual(len(resp.context['posts']), 5)
+
+		resp = self.client.get(reverse('user_profile', args=['writer']))
+		self.assertEqual(resp.context['author_posts_count'], FORUM_PAGE_SIZE + 5)
+		self.assertEqual(len(resp.context['posts']), FORUM_PAGE_SIZE)
+		self.assertTrue(resp.context['posts'].has_next)
+
+
+class ForumCounterTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.author = User.objects.create_user(username='writer', password='pass')
+		self.reader = User.objects.create_user(username='reader', password='pass')
+		self.post = ForumPost.objects.create(author=self.author, title='A', content='x')
+
+	def test_likes_and_comments_keep_exact_counters(self):
+		self.client.login(username='reader', password='pass')
+		self.assertEqual(self.client.post(reverse('toggle_like', args=[self.post.id])).json()['like_count'], 1)
+		for text in ('một', 'hai', 'ba'):
+			self.client.post(reverse('add_comment', args=[self.post.id]), {'content': text})
+		PostLike.objects.create(user=self.author, post=self.post)
+		self.post.refresh_from_db()
+		# Không còn nhân chéo like x comment
+		self.assertEqual((self.post.like_count, self.post.comment_count), (2, 3))
+
+		self.assertEqual(self.client.post(reverse('toggle_like', args=[self.post.id])).json()['like_count'], 1)
+		PostComment.objects.filter(post=self.post).first().delete()
+		self.post.refresh_from_db()
+		self.assertEqual((self.post.like_count, self.post.comment_count), (1, 2))
+		resp = self.client.get(reverse('forum_detail', args=[self.post.id]))
+		self.assertEqual(resp.context['post_total_comments'], 2)
+
+	def test_like_toggle_and_batch_state(self):
+		other = ForumPost.objects.create(author=self.author, title='B', content='y')
+		self.client.login(username='reader', password='pass')
+		url = reverse('toggle_like', args=[self.post.id])
+		self.assertEqual(self.client.post(url).json(), {'liked': True, 'like_count': 1})
+		self.assertEqual(self.client.post(url).json(), {'liked': False, 'like_count': 0})
+		self.assertEqual(self.client.post(url).json(), {'liked': True, 'like_count': 1})
+		self.assertEqual(self.client.post(reverse('toggle_like', args=[999])).status_code, 404)
+
+		state_url = reverse('forum_like_state')
+		resp = self.client.get(state_url, {'ids': f'{self.post.id},{other.id},abc'})
+		self.assertEqual(resp.json(), {'liked': [self.post.id]})
+		resp = self.client.get(reverse('forum_list'))
+		self.assertEqual(resp.context['liked_ids'], {self.post.id})
+		self.client.logout()
+		self.assertEqual(self.client.get(state_url, {'ids': str(self.post.id)}).json(), {'liked': []})
+
+	def test_edits_do_not_write_counters(self):
+		get_user_model().objects.filter(username='writer').update(is_staff=True)
+		self.client.login(username='writer', password='pass')
+		requests = [
+			(reverse('forum_edit', args=[self.post.id]), {'title': 'B', 'content': 'y', 'tags': 'django'}),
+			(reverse('forum_toggle_pin', args=[self.post.id]), {}),
+			(reverse('forum_toggle_feature', args=[self.post.id]), {}),
+		]
+		for url, data in requests:
+			with CaptureQueriesContext(connection) as ctx:
+				self.client.post(url, data)
+			updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "courses_forumpost"')]
+			# Ghi đè like_count/comment_count/views sẽ làm mất các lần tăng bằng F() chạy song song
+			self.assertTrue(updates)
+			for sql in updates:
+				self.assertNotIn('"like_count" =', sql)
+				self.assertNotIn('"views" =', sql)
+		self.post.refresh_from_db()
+		self.assertEqual((self.post.title, self.post.is_pinned, self.post.is_featured), ('B', True, True))
+
+	def test_reconcile_repairs_drift(self):
+		PostComment.objects.create(author=self.reader, post=self.post, content='x')
+		ForumPost.objects.filter(pk=self.post.pk).update(like_count=7, comment_count=0)
+		self.assertEqual(refresh_post_counters(), 1)
+		self.assertEqual(refresh_post_counters(), 0)
+		self.post.refresh_from_db()
+		self.assertEqual((self.post.like_count, self.post.comment_count), (0, 1))
+
+
+class CommunityStatsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+		self.post = ForumPost.objects.create(author=self.author, title='A', content='x')
+
+	def test_counters_follow_creates_and_deletes(self):
+		self.assertEqual(community_stats(), {'posts': 1, 'comments': 0, 'users': 1, 'courses': 0})
+		with self.captureOnCommitCallbacks(execute=True):
+			PostComment.objects.create(author=self.author, post=self.post, content='x')
+			ForumPost.objects.create(author=self.author, title='B', content='y')
+		with self.captureOnCommitCallbacks(execute=True):
+			self.post.delete()
+		# Đọc từ cache: không truy vấn COUNT nào
+		with self.assertNumQueries(0):
+			self.assertEqual(community_stats(), {'posts': 1, 'comments': 0, 'users': 1, 'courses': 0})
+		resp = self.client.get(reverse('forum_list'))
+		self.assertEqual((resp.context['total_posts'], resp.context['active_users']), (1, 1))
+
+	def test_reconcile_repairs_drift(self):
+		community_stats()
+		ForumPost.objects.create(author=self.author, title='B', content='y')
+		self.assertEqual(community_stats()['posts'], 1)
+		self.assertEqual(reconcile_community_stats()['posts'], 2)
+		self.assertEqual(community_stats()['posts'], 2)
+
+
+class ForumCommentsApiTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.author = User.objects.create_user(username='writer', password='pass')
+		self.post = ForumPost.objects.create(author=self.author, title='A', content='x')
+		for i in range(7):
+			user = User.objects.create_user(username=f'u{i}', password='pass')
+			PostComment.objects.create(author=user, post=self.post, content=f'c{i}')
+
+	def test_after_cursor_pages_comments_with_authors_joined(self):
+		resp = self.client.get(reverse('forum_detail', args=[self.post.id]))
+		first = resp.context['comments']
+		self.assertEqual([c.content for c in first], ['c0', 'c1', 'c2', 'c3', 'c4'])
+
+		url = reverse('forum_comments', args=[self.post.id])
+		# Một truy vấn lấy tác giả bài viết, một truy vấn bình luận kèm JOIN user
+		with self.assertNumQueries(2):
+			data = self.client.get(url, {'after': resp.context['comments_next_after']}).json()
+		self.assertEqual([(c['content'], c['author']) for c in data['comments']], [('c5', 'u5'), ('c6', 'u6')])
+		self.assertIsNone(data['next_after'])
+		self.assertEqual(self.client.get(reverse('forum_comments', args=[999])).status_code, 404)
+
+
+class AuthorStatsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.author = User.objects.create_user(username='writer', password='pass')
+		self.reader = User.objects.create_user(username='reader', password='pass')
+
+	def stats(self, user):
+		user.forum_stats.refresh_from_db()
+		s = user.forum_stats
+		return (s.post_count, s.comment_count, s.likes_received)
+
+	def test_signals_keep_author_stats_current(self):
+		post = ForumPost.objects.create(author=self.author, title='A', content='x')
+		PostComment.objects.create(author=self.reader, post=post, content='hay')
+		PostLike.objects.create(user=self.reader, post=post)
+		self.assertEqual(self.stats(self.author), (1, 0, 1))
+		self.assertEqual(self.stats(self.reader), (0, 1, 0))
+
+		resp = self.client.get(reverse('user_profile', args=['writer']))
+		self.assertEqual((resp.context['author_posts_count'], resp.context['author_likes_received']), (1, 1))
+
+		# Xóa bài: like và bình luận bị xóa theo cascade
+		post.delete()
+		self.assertEqual(self.stats(self.author), (0, 0, 0))
+		self.assertEqual(self.stats(self.reader), (0, 0, 0))
+
+	def test_rebuild_recreates_rows(self):
+		post = ForumPost.objects.create(author=self.author, title='A', content='x')
+		PostLike.objects.create(user=self.reader, post=post)
+		self.author.forum_stats.delete()
+		self.assertEqual(refresh_author_stats(), 2)
+		self.assertEqual(self.stats(get_user_model().objects.get(pk=self.author.pk)), (1, 0, 1))
+
+
+class RenderedBodyTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+
+	def test_bodies_are_rendered_escaped_at_write_time(self):
+		post = ForumPost.objects.create(author=self.author, title='A', content='<b>xin</b> chào\nhttps://example.com')
+		self.assertEqual(
+			post.content_html,
+			'&lt;b&gt;xin&lt;/b&gt; chào<br><a href="https://example.com" rel="nofollow">https://example.com</a>',
+		)
+		self.assertEqual((post.word_count, post.reading_time), (3, 1))
+
+		post.content = 'từ ' * 401
+		post.save(update_fields=['content'])
+		post.refresh_from_db()
+		self.assertEqual((post.word_count, post.reading_time), (401, 3))
+
+		comment = PostComment.objects.create(author=self.author, post=post, content='<i>a</i>\nb')
+		self.assertEqual(comment.content_html, '&lt;i&gt;a&lt;/i&gt;<br>b')
+		resp = self.client.get(reverse('forum_detail', args=[post.id]))
+		self.assertContains(resp, '&lt;i&gt;a&lt;/i&gt;<br>b')
+		self.assertEqual(resp.context['reading_time'], 3)
+
+	def test_backfill_rerenders_in_batches(self):
+		posts = [ForumPost.objects.create(author=self.author, title=str(i), content=f'<b>{i}</b>') for i in range(3)]
+		PostComment.objects.create(author=self.author, post=posts[0], content='<i>a</i>')
+		ForumPost.objects.update(content_html='', word_count=0)
+		PostComment.objects.update(content_html='')
+		out = StringIO()
+		call_command('backfill_post_html', batch_size=2, stdout=out)
+		self.assertIn('Rendered 3 post(s) and 1 comment(s).', out.getvalue())
+		self.assertEqual(set(ForumPost.objects.values_list('word_count', flat=True)), {1})
+		self.assertEqual(PostComment.objects.get().content_html, '&lt;i&gt;a&lt;/i&gt;')
+
+
+class CacheLogTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.log = CacheLog('test:log')
+
+	def drain(self):
+		return set().union(*self.log.drain(2))
+
+	def test_late_slots_are_retried_and_drains_do_not_overlap(self):
+		self.log.append(1)
+		# Slot 2 đã cấp số nhưng tiến trình ghi chưa kịp set
+		cache.incr(self.log.seq_key)
+		self.log.append(3)
+		self.assertEqual(self.drain(), {1, 3})
+		cache.set(self.log.slot_key.format(2), 2, None)
+		self.assertEqual(self.drain(), {2})
+		self.assertEqual(self.drain(), set())
+
+		self.log.append(4)
+		outer = self.log.drain(2)
+		self.assertEqual(next(outer), {4})
+		# Lượt đọc thứ hai trong lúc lượt đầu chưa xong: không đọc trùng
+		self.assertEqual(self.drain(), set())
+		self.assertEqual(list(outer), [])
+		self.assertEqual(self.drain(), set())
+
+
+@override_settings(FORUM_BUFFER_VIEWS=True)
+class ForumViewCounterTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		author = get_user_model().objects.create_user(username='writer', password='pass')
+		self.post = ForumPost.objects.create(author=author, title='A', content='x', views=10)
+
+	def test_views_are_buffered_then_flushed(self):
+		url = reverse('forum_detail', args=[self.post.id])
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+		self.client.get(url)
+		resp = self.client.get(url)
+		self.assertEqual(resp.context['post'].views, 13)
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.views, 10)
+
+		other = ForumPost.objects.create(author=self.post.author, title='B', content='y')
+		self.client.get(reverse('forum_detail', args=[other.id]))
+		# Chỉ các bài trong log dirty, một UPDATE cho cả lô
+		with CaptureQueriesContext(connection) as ctx:
+			self.assertEqual(flush_all_views(), 4)
+		self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+		with self.assertNumQueries(0):
+			self.assertEqual(flush_all_views(), 0)
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.views, 13)
+
+		# Bài đã flush được ghi lại vào log ở lượt xem kế tiếp
+		self.client.get(url)
+		self.assertEqual(flush_all_views(), 1)
+
+	def test_threshold_flushes_hot_post(self):
+		url = reverse('forum_detail', args=[self.post.id])
+		for _ in range(VIEW_FLUSH_THRESHOLD):
+			self.client.get(url)
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.views, 10 + VIEW_FLUSH_THRESHOLD)
+		self.assertEqual(self.client.get(url).context['post'].views, 11 + VIEW_FLUSH_THRESHOLD)
+
+	def test_concurrent_flushes_write_each_view_once(self):
+		for _ in range(3):
+			record_view(self.post.id)
+		write = view_counter._write_views
+		inner = []
+
+		def write_while_another_flush_runs(deltas):
+			# Flush thứ hai (vd. cron) chạy giữa lúc flush đầu đang ghi, cùng một lượt xem mới
+			inner.append(flush_post_views([self.post.id]))
+			record_view(self.post.id)
+			write(deltas)
+
+		with mock.patch.object(view_counter, '_write_views', side_effect=write_while_another_flush_runs):
+			self.assertEqual(flush_post_views([self.post.id]), 3)
+		self.assertEqual(inner, [0])
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.views, 13)
+		# Lượt xem đến trong lúc flush vẫn chờ ghi và nằm trong log
+		self.assertEqual(flush_all_views(), 1)
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.views, 14)
+
+	def test_failed_write_keeps_views_pending(self):
+		record_view(self.post.id)
+		with mock.patch.object(view_counter, '_write_views', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+			flush_post_views([self.post.id])
+		self.assertEqual(pending_views([self.post.id]), {self.post.id: 1})
+		self.assertEqual(flush_post_views([self.post.id]), 1)
+
+	def test_flush_command_refuses_a_per_process_cache(self):
+		# Cache test là LocMem: cron không thấy bộ đếm của tiến trình web
+		with self.assertRaises(CommandError):
+			call_command('flush_view_counts', stdout=StringIO())
+
+	@override_settings(FORUM_BUFFER_VIEWS=False)
+	def test_views_are_written_directly_without_a_shared_cache(self):
+		resp = self.client.get(reverse('forum_detail', args=[self.post.id]))
+		self.assertEqual(resp.context['post'].views, 11)
+		self.post.refresh_from_db()
+		self.assertEqual(self.post.views, 11)
+		self.assertEqual(pending_views([self.post.id]), {})
+		out = StringIO()
+		call_command('flush_view_counts', stdout=out)
+		self.assertIn('nothing to flush', out.getvalue())
+
+
+class RelatedPostsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+		make = lambda title, tags: ForumPost.objects.create(author=self.author, title=title, content=title, tags=tags)
+		self.orm = make('Django ORM truy vấn chậm', 'django orm')
+		self.queryset = make('Tối ưu queryset Django ORM', 'django')
+		self.pandas = make('Pandas đọc file CSV', 'pandas')
+		self.numpy = make('Numpy và pandas cho dữ liệu', 'pandas numpy')
+		self.assertEqual(process_related_queue(), 4)
+
+	def related(self, post):
+		resp = self.client.get(reverse('forum_detail', args=[post.id]))
+		return resp.context['related_posts']
+
+	def test_neighbours_follow_content_and_edits(self):
+		self.assertEqual(self.related(self.orm), [self.queryset])
+		self.assertEqual(self.related(self.pandas), [self.numpy])
+
+		self.queryset.title = self.queryset.content = 'Pandas groupby nhanh hơn'
+		self.queryset.tags = 'pandas'
+		# Lưu bài chỉ xếp hàng, không đọc toàn bộ diễn đàn trong request
+		with CaptureQueriesContext(connection) as ctx:
+			self.queryset.save()
+		self.assertFalse([q for q in ctx.captured_queries if '"courses_relatedpost"' in q['sql']])
+		self.assertEqual(self.related(self.orm), [self.queryset])
+		self.assertEqual(process_related_queue(), 1)
+		self.assertEqual(process_related_queue(), 0)
+		self.assertEqual(self.related(self.orm), [])
+		self.assertIn(self.queryset, self.related(self.pandas))
+
+		self.numpy.delete()
+		self.assertEqual(self.related(self.pandas), [self.queryset])
+		process_related_queue()
+		self.assertEqual(self.related(self.pandas), [self.queryset])
+
+	def test_queue_survives_overlapping_runs_and_requeues(self):
+		self.orm.title = 'Django ORM nhanh'
+		self.orm.save()
+		update = related_module.update_related_posts
+		seen = []
+
+		def update_while_another_run_starts(post_id, corpus):
+			# Lượt cron thứ hai bắt đầu khi lượt đầu đang chạy; bài được sửa tiếp giữa chừng
+			seen.append(process_related_queue())
+			self.orm.title = 'Django ORM rất nhanh'
+			self.orm.save()
+			update(post_id, corpus)
+
+		with mock.patch.object(related_module, 'update_related_posts', side_effect=update_while_another_run_starts):
+			self.assertEqual(process_related_queue(), 1)
+		self.assertEqual(seen, [0])
+		# Lần sửa giữa chừng được giữ cho lượt sau
+		self.assertEqual(list(RelatedPostUpdate.objects.values_list('post_id', 'claim')), [(self.orm.id, '')])
+		self.assertEqual(process_related_queue(), 1)
+		self.assertFalse(RelatedPostUpdate.objects.exists())
+
+	def test_bulk_delete_of_linked_posts(self):
+		# pre_delete của bài này xếp hàng bài kia, cũng đang bị xóa
+		ForumPost.objects.filter(pk__in=[self.pandas.id, self.numpy.id]).delete()
+		self.assertEqual(process_related_queue(), 0)
+		self.assertFalse(RelatedPostUpdate.objects.exists())
+
+	def test_rebuild_matches_incremental_lists(self):
+		before = {p.id: self.related(p) for p in ForumPost.objects.all()}
+		self.assertEqual(rebuild_related_posts(), 4)
+		self.assertEqual({p.id: self.related(p) for p in ForumPost.objects.all()}, before)
+
+
+class ActivityFeedTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		activity_bus.reset()
+		self.author = get_user_model().objects.create_user(username='writer', password='pass')
+		self.post = ForumPost.objects.create(author=self.author, title='Bài đầu tiên', content='x')
+
+	def test_long_poll_seeds_once_then_serves_published_events(self):
+		data = self.client.get(reverse('activity_poll')).json()
+		self.assertEqual([e['title'] for e in data['events']], ['Bài đầu tiên'])
+
+		self.client.login(username='writer', password='pass')
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('add_comment', args=[self.post.id]), {'content': 'Chào'})
+		with self.assertNumQueries(0):
+			data = self.client.get(reverse('activity_poll'), {'last_id': data['last_id']}).json()
+		self.assertEqual([(e['type'], e['content']) for e in data['events']], [('comment', 'Chào')])
+
+	def test_waiting_client_is_woken_by_publish(self):
+		activity_bus.ensure_seeded()
+		seq = activity_bus.last_seq
+
+		async def wait():
+			threading.Timer(0.05, activity_bus.publish, args=[{'type': 'post', 'title': 'Mới'}]).start()
+			return await activity_bus.wait(seq, timeout=5)
+
+		events = asyncio.run(wait())
+		self.assertEqual([e['title'] for e in events], ['Mới'])
+		self.assertEqual(asyncio.run(activity_bus.wait(activity_bus.last_seq, timeout=0.01)), [])
+
+	async def test_stream_sends_backlog_as_server_sent_events(self):
+		resp = await self.async_client.get(reverse('activity_stream'))
+		self.assertEqual(resp['Content-Type'], 'text/event-stream')
+		chunks = resp.streaming_content
+		self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+		event = (await anext(chunks)).decode()
+		await chunks.aclose()
+		self.assertTrue(event.startswith('id: 1\nevent: activity\n'))
+		self.assertEqual(json.loads(event.split('data: ', 1)[1])['title'], 'Bài đầu tiên')
+
+	def test_recent_activity_revalidates_and_pages_forward(self):
+		url = reverse('recent_activity')
+		resp = self.client.get(url)
+		self.assertEqual([e['title'] for e in resp.json()['events']], ['Bài đầu tiên'])
+		etag, cursor = resp['ETag'], resp.json()['cursor']
+
+		# Không có gì mới: chỉ hai truy vấn max id, trả 304
+		with self.assertNumQueries(2):
+			resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 304)
+
+		PostComment.objects.create(author=self.author, post=self.post, content='Mới')
+		resp = self.client.get(url, {'since': cursor}, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([e['content'] for e in resp.json()['events']], ['Mới'])
+
+	def test_recent_activity_etag_changes_on_edit_and_delete(self):
+		url = reverse('recent_activity')
+		comment = PostComment.objects.create(author=self.author, post=self.post, content='Cũ')
+		etag = self.client.get(url)['ETag']
+
+		# Lưu lại mà không đổi tiêu đề: vẫn 304
+		with self.captureOnCommitCallbacks(execute=True):
+			ForumPost.objects.get(pk=self.post.pk).save(update_fields=['views'])
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+		self.post.title = 'Đã sửa'
+		with self.captureOnCommitCallbacks(execute=True):
+			self.post.save()
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('Đã sửa', [e.get('title') for e in resp.json()['events']])
+
+		etag = resp['ETag']
+		with self.captureOnCommitCallbacks(execute=True):
+			comment.delete()
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([e['type'] for e in resp.json()['events']], ['post'])
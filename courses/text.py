@@ -0,0 +1,53 @@
+"""Text helpers shared by models, search and rendering."""
+import re
+import unicodedata
+
+from django.template.defaultfilters import linebreaksbr, urlize
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_search_text(value):
+    """Fold ``value`` for accent-insensitive matching.
+
+    Strips Vietnamese diacritics (``đ`` becomes ``d``), case-folds and
+    collapses whitespace: ``'Lập Trình  Cơ Bản'`` -> ``'lap trinh co ban'``.
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFD', str(value))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    stripped = stripped.replace('đ', 'd').replace('Đ', 'D')
+    return _SPACES.sub(' ', stripped.casefold()).strip()
+
+
+_TAG_SEPARATORS = re.compile(r'[\s,]+')
+
+
+def split_tags(value):
+    """Split a free-form tags string (spaces or commas) into unique lowercase tags."""
+    tags = []
+    for tag in _TAG_SEPARATORS.split(value or ''):
+        tag = tag.strip().lstrip('#').lower()[:50]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+WORDS_PER_MINUTE = 200
+
+
+def render_body_html(value, links=True):
+    """Escaped HTML for a post or comment body, stored at write time.
+
+    Same output as ``{{ value|linebreaksbr|urlize }}`` (``links=False`` drops
+    ``urlize``, as comments did), so templates print it with ``|safe``.
+    """
+    html = linebreaksbr(value or '', autoescape=True)
+    return str(urlize(html, autoescape=True) if links else html)
+
+
+def reading_stats(value):
+    """``(word_count, reading_minutes)`` at ``WORDS_PER_MINUTE``, at least one minute."""
+    words = len((value or '').split())
+    return words, max(1, (words + WORDS_PER_MINUTE - 1) // WORDS_PER_MINUTE)
@@ -7,10 +7,12 @@ urlpatterns = [
     # Legacy static path used in some templates/bookmarks — redirect to current list
     path('courses/course_list.html/', RedirectView.as_view(url='/', permanent=True)),
     path('', views.home, name='course_list'),
+    path('api/courses/', views.course_catalog_api, name='course_catalog_api'),
     path('course/<int:course_id>/', views.course_detail, name='course_detail'),
     path('add-to-cart/<int:course_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/', views.view_cart, name='view_cart'),
     path('search/', views.search_courses, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('checkout/', views.checkout, name='checkout'),
     path('payment-success/', views.payment_success, name='payment_success'),
     path('checkout-direct/<int:course_id>/', views.checkout_direct, name='checkout_direct'),
@@ -30,6 +32,7 @@ urlpatterns = [
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/payment/<int:payment_id>/approve/', views.admin_approve_payment, name='admin_approve_payment'),
     path('admin/payment/<int:payment_id>/reject/', views.admin_reject_payment, name='admin_reject_payment'),
+    path('admin/payments/bulk/', views.admin_bulk_payments, name='admin_bulk_payments'),
     path('forum/', views.forum_list, name='forum_list'),
     path('forum/create/', views.forum_create, name='forum_create'),
     path('forum/<int:post_id>/', views.forum_detail, name='forum_detail'),
@@ -40,8 +43,12 @@ urlpatterns = [
     path('forum/<int:post_id>/edit/', views.forum_edit, name='forum_edit'),
     path('forum/<int:post_id>/delete/', views.forum_delete, name='forum_delete'),
     path('forum/<int:post_id>/like/', views.toggle_like, name='toggle_like'),
+    path('forum/likes/', views.forum_like_state, name='forum_like_state'),
     path('forum/<int:post_id>/comment/', views.add_comment, name='add_comment'),
+    path('forum/<int:post_id>/comments/', views.forum_comments, name='forum_comments'),
     path('recent-activity/', views.recent_activity, name='recent_activity'),
+    path('recent-activity/stream/', views.activity_stream, name='activity_stream'),
+    path('recent-activity/poll/', views.activity_poll, name='activity_poll'),
     path('remove-from-cart/<int:course_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('course/<int:course_id>/learning-path/', views.learning_path, name='learning_path'),
     path('toggle-task/<int:task_id>/', views.toggle_task_completion, name='toggle_task_completion'),
@@ -0,0 +1,42 @@
+"""Which courses the current user owns, has in the cart or wishlisted.
+
+Loaded once per request in a fixed number of queries (one per relation,
+none for anonymous users) so course cards can check membership in a set
+instead of querying per course.
+"""
+import hashlib
+
+from .models import Cart, LearningPathEnrollment, Payment, Wishlist
+
+EMPTY = frozenset()
+
+
+class UserCourseState:
+    def __init__(self, user):
+        if not user.is_authenticated:
+            self.owned = self.in_cart = self.wishlisted = self.enrolled = EMPTY
+        else:
+            self.owned = frozenset(
+                Payment.objects.filter(user=user, status='completed').values_list('course_id', flat=True)
+            )
+            self.in_cart = frozenset(Cart.objects.filter(user=user).values_list('course_id', flat=True))
+            self.wishlisted = frozenset(Wishlist.objects.filter(user=user).values_list('course_id', flat=True))
+            self.enrolled = frozenset(
+                LearningPathEnrollment.objects.filter(user=user, status='active')
+                .values_list('learning_path__course_id', flat=True)
+            )
+        # Khóa học user được vào học: đã thanh toán hoặc được gán lộ trình
+        self.accessible = self.owned | self.enrolled
+
+    def fingerprint(self):
+        """Short digest of the state, for ETags of per-user responses."""
+        raw = '|'.join(','.join(map(str, sorted(ids))) for ids in (self.accessible, self.in_cart, self.wishlisted))
+        return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def get_user_course_state(request):
+    """The request's ``UserCourseState``, loaded on first use."""
+    state = getattr(request, '_course_state', None)
+    if state is None:
+        state = request._course_state = UserCourseState(request.user)
+    return state
@@ -0,0 +1,103 @@
+"""Write-behind counter for ``ForumPost.views``.
+
+A page view only increments a cache counter; pending counts are added to
+the ``views`` column when a post's pending count reaches
+``VIEW_FLUSH_THRESHOLD`` or when the ``flush_view_counts`` command runs
+(e.g. every minute from cron). Displayed counts are the stored value plus
+the pending delta.
+
+A counter going from 0 to 1 appends its post id to a dirty ``CacheLog``;
+the command flushes just the logged posts, one ``UPDATE ... CASE`` per
+batch, so an idle forum costs nothing.
+
+A flush takes a per-post lock (``cache.add``) so two flushes never move
+the same views, writes the database first and only then subtracts what it
+wrote from the counter; if the UPDATE fails the views stay pending.
+
+Counters and the log live in the default cache, which the web processes
+and the cron command must share, so buffering is only on when
+``settings.FORUM_BUFFER_VIEWS`` is set (it follows ``REDIS_URL``).
+Without it every view is one ``UPDATE views = views + 1``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .cache_log import CacheLog
+from .models import ForumPost
+
+VIEW_KEY = 'forum:views:{}'
+FLUSH_LOCK_KEY = 'forum:views:flushing:{}'
+# Khóa tự hết hạn nếu tiến trình flush chết giữa chừng
+FLUSH_LOCK_TIMEOUT = 60
+VIEW_FLUSH_THRESHOLD = 50
+FLUSH_BATCH_SIZE = 500
+
+dirty_posts = CacheLog('forum:views:dirty')
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def record_view(post_id):
+    """Count one view of ``post_id``; returns how many views to add to a ``views`` value read before the call."""
+    if not settings.FORUM_BUFFER_VIEWS:
+        ForumPost.objects.filter(pk=post_id).update(views=F('views') + 1)
+        return 1
+    pending = _incr(VIEW_KEY.format(post_id))
+    if pending == 1:
+        dirty_posts.append(post_id)
+    # incr trả về mỗi giá trị đúng một lần: chỉ một request chạm ngưỡng và flush
+    if pending == VIEW_FLUSH_THRESHOLD:
+        flush_post_views([post_id])
+    return pending
+
+
+def pending_views(post_ids):
+    """``{post_id: pending views}`` for ``post_ids`` in one cache round trip."""
+    keys = {VIEW_KEY.format(post_id): post_id for post_id in post_ids}
+    return {keys[key]: count for key, count in cache.get_many(keys).items() if count}
+
+
+def _write_views(deltas):
+    ForumPost.objects.filter(pk__in=deltas).update(views=F('views') + Case(
+        *[When(pk=post_id, then=Value(count)) for post_id, count in deltas.items()],
+        default=Value(0),
+        output_field=PositiveIntegerField(),
+    ))
+
+
+def flush_post_views(post_ids):
+    """Move pending views of ``post_ids`` into ``ForumPost.views`` in one UPDATE; returns views written.
+
+    Posts another flush is already writing are skipped; that flush leaves
+    anything it did not write pending and logged.
+    """
+    claimed = [post_id for post_id in post_ids if cache.add(FLUSH_LOCK_KEY.format(post_id), 1, FLUSH_LOCK_TIMEOUT)]
+    try:
+        deltas = pending_views(claimed)
+        if not deltas:
+            return 0
+        _write_views(deltas)
+        for post_id, count in deltas.items():
+            # decr (không delete) để giữ lượt xem đến trong lúc flush
+            try:
+                remaining = cache.decr(VIEW_KEY.format(post_id), count)
+            except ValueError:
+                continue
+            if remaining > 0:
+                # Có lượt xem mới trong lúc flush: bộ đếm không về 0 nên tự ghi lại vào log
+                dirty_posts.append(post_id)
+        return sum(deltas.values())
+    finally:
+        cache.delete_many([FLUSH_LOCK_KEY.format(post_id) for post_id in claimed])
+
+
+def flush_all_views(batch_size=FLUSH_BATCH_SIZE):
+    """Flush the posts logged as dirty since the last run, ``batch_size`` at a time."""
+    return sum(flush_post_views(post_ids) for post_ids in dirty_posts.drain(batch_size))
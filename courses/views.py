@@ -1,16 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotFound, StreamingHttpResponse, Http404
 from django.contrib.auth.models import User
 from django.contrib.auth import login as auth_login, get_user_model, logout
-from django.db.models import Sum, Avg, Count, Q, F
+from django.db.models import Sum
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from django.core.signing import dumps, loads, BadSignature, SignatureExpired
 from django.urls import reverse
 from django.core.paginator import Paginator
+from django.views.decorators.http import condition, require_GET
+import hashlib
+import json
+import time
+from asgiref.sync import sync_to_async
 from django.contrib.admin.views.decorators import staff_member_required
 import qrcode
 import io
@@ -19,46 +24,54 @@ import os
 from allauth.account.models import EmailConfirmation
 from .models import (
     Course, Cart, Payment, Review, Contact, LearningPathEnrollment,
-    LearningPath, WeeklySchedule, DailyTask, ForumPost, PostLike, PostComment
+    LearningPath, WeeklySchedule, DailyTask, ForumPost, PostLike, PostComment, RelatedPost
 )
 from .forms import ReviewForm
+from .catalog import (
+    DEFAULT_SORT, PAGE_SIZE, SORT_ORDERINGS, catalog_ordering, catalog_paginator, catalog_queryset,
+    category_counts, course_card,
+)
+from .page_cache import cache_anonymous_catalog, catalog_version, page_cache_stats
+from .user_state import get_user_course_state
+from .search import search_courses_ranked
+from .suggest import SUGGEST_LIMIT, suggest_index
+from .forum import (
+    DEFAULT_FORUM_SORT, FORUM_ORDERINGS, FORUM_PAGE_SIZE, PROFILE_ORDERING, comment_json, comment_page,
+    forum_page, forum_queryset, liked_post_ids, toggle_post_like,
+)
+from .pagination import KeysetPaginator
+from .tags import popular_forum_tags
+from .text import normalize_search_text
+from .view_counter import record_view
+from .community import community_stats
+from .learning_paths import activate_enrollment, provision_learning_path
+from .payments import approve_payments, reject_payments, send_payment_confirmations
+from .stats import author_stats
+from .events import (
+    KEEPALIVE_INTERVAL, LONG_POLL_TIMEOUT, RETRY_MS, STREAM_MAX_AGE, activity_bus, activity_marker, activity_version,
+    format_activity_cursor, load_recent_activity, parse_activity_cursor,
+)
 
+@cache_anonymous_catalog
 def home(request):
     category = request.GET.get('category', '')
     sort = request.GET.get('sort', 'newest')
 
-    # Lấy danh sách khóa học với annotate cho các meta cần thiết
-    courses = Course.objects.all().annotate(
-        enrollment_count=Count('payment', filter=Q(payment__status='completed')),
-        average_rating=Avg('review__rating')
-    )
-    if category:
-        courses = courses.filter(category=category)
-
-    # Áp dụng sắp xếp
-    if sort == 'popular':
-        courses = courses.order_by('-enrollment_count', '-created_at')
-    elif sort == 'price_asc':
-        courses = courses.order_by('price')
-    elif sort == 'price_desc':
-        courses = courses.order_by('-price')
-    elif sort == 'rating':
-        courses = courses.order_by('-average_rating', '-created_at')
+    # Lấy danh sách khóa học; số liệu đọc từ bảng CourseStats (không GROUP BY)
+    courses = catalog_queryset(category, sort)
+    # Phân trang: `cursor` dùng keyset (không COUNT/OFFSET), còn lại dùng số trang
+    paginator = catalog_paginator(courses, sort)
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        courses = paginator.page(cursor)
+        next_cursor = courses.next_cursor
     else:
-        courses = courses.order_by('-created_at')
-    # Paginate courses (9 per page)
-    page_number = request.GET.get('page', 1)
-    paginator = Paginator(courses, 9)
-    courses = paginator.get_page(page_number)
+        courses = Paginator(courses, PAGE_SIZE).get_page(request.GET.get('page', 1))
+        # Nút "Xem thêm" tiếp tục bằng keyset từ cuối trang hiện tại
+        next_cursor = paginator.cursor_for(courses[-1]) if courses.has_next() else None
     
-    # Đếm số khóa học theo danh mục
-    category_counts = {
-        'all_count': Course.objects.count(),
-        'python_count': Course.objects.filter(category='python').count(),
-        'django_count': Course.objects.filter(category='django').count(),
-        'web_count': Course.objects.filter(category='web').count(),
-        'data_count': Course.objects.filter(category='data').count(),
-    }
+    # Số khóa học theo danh mục do context processor `catalog_facets` cung cấp
+    # (một truy vấn GROUP BY, có cache)
     
     # Danh sách danh mục cho template
     course_categories = Course.CATEGORY_CHOICES
@@ -68,9 +81,52 @@ def home(request):
         'selected_category': category,
         'course_categories': course_categories,
         'sort': sort,
-        **category_counts  # Truyền tất cả counts vào template
+        'total_count': category_counts().get(category or 'all', 0),
+        'cursor_mode': cursor is not None,
+        'next_cursor': next_cursor,
+        'course_state': get_user_course_state(request),
     })
 
+
+def _catalog_api_etag(request):
+    # Thay đổi khi catalog được ghi (version) hoặc tham số/người dùng khác nhau
+    raw = f"{catalog_version()}|{request.user.pk}|{request.GET.urlencode()}"
+    if request.user.is_authenticated:
+        raw += f"|{get_user_course_state(request).fingerprint()}"
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+@require_GET
+@condition(etag_func=_catalog_api_etag)
+def course_catalog_api(request):
+    """JSON version of `home` for the catalog's load-more and filter UI.
+
+    Same `category`/`sort` parameters; `page` gives numbered pages, otherwise
+    results are keyset-paged with `cursor` and the returned `next_cursor`.
+    """
+    category = request.GET.get('category', '')
+    sort = request.GET.get('sort', 'newest')
+    courses = catalog_queryset(category, sort)
+
+    data = {'total': category_counts().get(category or 'all', 0)}
+    if 'page' in request.GET:
+        page = Paginator(courses, PAGE_SIZE).get_page(request.GET.get('page'))
+        data.update({
+            'page': page.number,
+            'num_pages': page.paginator.num_pages,
+            'next_cursor': catalog_paginator(courses, sort).cursor_for(page[-1]) if page.has_next() else None,
+            'previous_cursor': None,
+        })
+    else:
+        page = catalog_paginator(courses, sort).page(request.GET.get('cursor'))
+        data.update({'next_cursor': page.next_cursor, 'previous_cursor': page.previous_cursor})
+    state = get_user_course_state(request)
+    data['courses'] = [course_card(course, state) for course in page]
+
+    response = JsonResponse(data)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @login_required
 def add_to_cart(request, course_id):
     course = get_object_or_404(Course, id=course_id)
@@ -110,23 +166,59 @@ def add_to_cart(request, course_id):
 @login_required
 # Xem giỏ hàng
 def view_cart(request):
-    cart_items = Cart.objects.filter(user=request.user)
+    cart_items = Cart.objects.filter(user=request.user).select_related('course__stats')
     return render(request, 'courses/cart.html', {'cart_items': cart_items})
 
 # Tìm kiếm khóa học
 def search_courses(request):
-    query = request.GET.get('q', '')
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category', '')
+    sort = request.GET.get('sort', '')
+    if sort not in SORT_ORDERINGS:
+        sort = 'relevance' if query else DEFAULT_SORT
+
+    courses = Course.objects.select_related('stats')
+    if category:
+        courses = courses.filter(category=category)
     if query:
-        courses = Course.objects.filter(title__icontains=query) | Course.objects.filter(description__icontains=query)
+        # Full-text index (FTS5 / tsvector): tối đa SEARCH_LIMIT kết quả liên quan nhất
+        ordering = None if sort == 'relevance' else catalog_ordering(sort)
+        courses = search_courses_ranked(query, courses, ordering=ordering)
     else:
-        courses = Course.objects.all()
-    
+        courses = courses.order_by(*catalog_ordering(sort))
+
+    page_obj = Paginator(courses, PAGE_SIZE).get_page(request.GET.get('page', 1))
     return render(request, 'courses/search_results.html', {
-        'courses': courses,
-        'query': query
+        'courses': page_obj,
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'page_range': page_obj.paginator.get_elided_page_range(page_obj.number),
+        'query': query,
+        'selected_category': category,
+        'sort': sort,
+        'course_state': get_user_course_state(request),
     })
 
 
+@require_GET
+def search_suggest(request):
+    """Typeahead for the search box, answered from the in-process prefix index."""
+    query = request.GET.get('q', '')[:100]
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGEST_LIMIT)), 1), 20)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    result = suggest_index.suggest(query, limit)
+    for item in result['courses']:
+        item['url'] = reverse('course_detail', args=[item['id']])
+    for item in result['tags']:
+        item['url'] = reverse('forum_tag', args=[item['tag']])
+    response = JsonResponse({'query': query, **result})
+    # Không phụ thuộc user, cho trình duyệt giữ lại một lúc khi gõ lại cùng tiền tố
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
 @login_required
 def payment_success(request):
     return render(request, 'courses/payment_success.html')
@@ -318,15 +410,7 @@ def activate_payment(request, token):
         return redirect('checkout')
 
     # Create Payment records (avoid duplicates)
-    from datetime import date as _date
-    from .models import LearningPath, WeeklySchedule, DailyTask, Lesson, LearningPathEnrollment
-
-    for cid in course_ids:
-        try:
-            course = Course.objects.get(pk=cid)
-        except Course.DoesNotExist:
-            continue
-
+    for course in Course.objects.filter(pk__in=course_ids):
         payment, created = Payment.objects.get_or_create(
             user=target_user,
             course=course,
@@ -337,83 +421,9 @@ def activate_payment(request, token):
             }
         )
 
-        # Ensure a LearningPath exists for the course
-        lp, lp_created = LearningPath.objects.get_or_create(
-            course=course,
-            defaults={
-                'total_weeks': 4,
-                'hours_per_week': 5,
-                'difficulty': 'beginner'
-            }
-        )
-
-        # If there are no weekly schedules, try to generate them from Lesson entries
-        if not WeeklySchedule.objects.filter(learning_path=lp).exists():
-            lessons = Lesson.objects.filter(course=course).order_by('order')
-            total_weeks = lp.total_weeks or 4
-
-            # Create weekly containers
-            weekly_objs = []
-            for w in range(1, total_weeks + 1):
-                ws = WeeklySchedule.objects.create(
-                    learning_path=lp,
-                    week_number=w,
-                    title=f'Tuần {w}',
-                    objectives=f'Nội dung tuần {w}',
-                    total_hours=lp.hours_per_week or 5
-                )
-                weekly_objs.append(ws)
-
-            # Distribute lessons across weeks roughly evenly
-            if lessons.exists():
-                n = lessons.count()
-                per_week = max(1, n // total_weeks)
-                extra = n % total_weeks
-                it = iter(lessons)
-                for i, ws in enumerate(weekly_objs, start=1):
-                    count_this_week = per_week + (1 if i <= extra else 0)
-                    for dnum in range(1, count_this_week + 1):
-                        try:
-                            lesson = next(it)
-                        except StopIteration:
-                            break
-                        DailyTask.objects.create(
-                            weekly_schedule=ws,
-                            day_number=dnum,
-                            title=lesson.title,
-                            description=f'Bài học: {lesson.title}',
-                            duration_minutes=60,
-                            resources=lesson.video_url or ''
-                        )
-            else:
-                # No lessons: create a placeholder task per week
-                for ws in weekly_objs:
-                    DailyTask.objects.create(
-                        weekly_schedule=ws,
-                        day_number=1,
-                        title=f'Bài học tuần {ws.week_number}',
-                        description='Nội dung học tập và video hướng dẫn',
-                        duration_minutes=60,
-                        resources=''
-                    )
-
-        # Create or update enrollment for the user
-        enrollment, created_en = LearningPathEnrollment.objects.get_or_create(
-            user=target_user,
-            learning_path=lp,
-            defaults={
-                'assigned_by': None,
-                'start_date': _date.today(),
-                'status': 'active'
-            }
-        )
-        if not created_en:
-            # If enrollment exists but inactive, activate and set start_date if missing
-            if enrollment.status != 'active':
-                enrollment.status = 'active'
-            if not enrollment.start_date:
-                enrollment.start_date = _date.today()
-            enrollment.save()
+        # Lộ trình dùng chung của khóa học (tạo một lần bằng bulk_create), rồi ghi danh
+        learning_path = provision_learning_path(course)
+        activate_enrollment(target_user, learning_path)
 
     # Remove related cart items for that user
     Cart.objects.filter(user=target_user, course__id__in=course_ids).delete()
@@ -447,17 +457,20 @@ def add_review(request, course_id):
 def admin_dashboard(request):
     pending_payments = Payment.objects.filter(status='pending').select_related('user', 'course').order_by('-created_at')
     
+    community = community_stats()
     stats = {
-        'total_courses': Course.objects.count(),
-        'total_users': User.objects.count(),
+        'total_courses': community['courses'],
+        'total_users': community['users'],
         'total_sales': Payment.objects.filter(status='completed').aggregate(Sum('amount'))['amount__sum'] or 0,
         'total_orders': Payment.objects.count(),
         'pending_orders': pending_payments.count(),
     }
+    page_cache = page_cache_stats()
     
     return render(request, 'courses/admin_dashboard.html', {
         'stats': stats,
         'pending_payments': pending_payments,
+        'page_cache': page_cache,
         'today': timezone.now()
     })
 
@@ -466,136 +479,47 @@ def admin_approve_payment(request, payment_id):
     if request.method != 'POST':
         return redirect('admin_dashboard')
         
-    payment = get_object_or_404(Payment, id=payment_id, status='pending')
-    
     try:
-        # 1. Cập nhật trạng thái thanh toán
-        payment.status = 'completed'
-        payment.approved_at = timezone.now()
-        payment.approved_by = request.user
-        payment.save()
-        
-        # 2. Kích hoạt lộ trình học tập
-        from .models import LearningPath, WeeklySchedule, DailyTask, Lesson, LearningPathEnrollment
-        from datetime import date as _date
-        
-        course = payment.course
-        user = payment.user
-        
-        # Đảm bảo LearningPath tồn tại
-        learning_path, lp_created = LearningPath.objects.get_or_create(
-            course=course,
-            defaults={
-                'total_weeks': 4,
-                'hours_per_week': 5,
-                'difficulty': 'beginner'
-            }
-        )
+        # Cập nhật trạng thái, kích hoạt lộ trình và ghi danh (courses.payments);
+        # chỉ thanh toán còn 'pending' được khóa và duyệt
+        approved = approve_payments([payment_id], request.user)
+        if not approved:
+            messages.warning(request, f'Thanh toán #{payment_id} không tồn tại hoặc đã được xử lý.')
+            return redirect('admin_dashboard')
         
-        # Tạo lịch trình hàng tuần nếu chưa có
-        if not WeeklySchedule.objects.filter(learning_path=learning_path).exists():
-            lessons = Lesson.objects.filter(course=course).order_by('order')
-            total_weeks = learning_path.total_weeks or 4
+        # Gửi email thông báo
+        send_payment_confirmations(approved, request.build_absolute_uri(reverse('my_courses')))
             
-            weekly_objs = []
-            for w in range(1, total_weeks + 1):
-                ws = WeeklySchedule.objects.create(
-                    learning_path=learning_path,
-                    week_number=w,
-                    title=f'Tuần {w}',
-                    objectives=f'Nội dung tuần {w}',
-                    total_hours=learning_path.hours_per_week or 5
-                )
-                weekly_objs.append(ws)
-            
-            # Phân bổ bài học vào các tuần
-            if lessons.exists():
-                n = lessons.count()
-                per_week = max(1, n // total_weeks)
-                extra = n % total_weeks
-                it = iter(lessons)
-                for i, ws in enumerate(weekly_objs, start=1):
-                    count_this_week = per_week + (1 if i <= extra else 0)
-                    for dnum in range(1, count_this_week + 1):
-                        try:
-                            lesson = next(it)
-                        except StopIteration:
-                            break
-                        DailyTask.objects.create(
-                            weekly_schedule=ws,
-                            day_number=dnum,
-                            title=lesson.title,
-                            description=f'Bài học: {lesson.title}',
-                            duration_minutes=60,
-                            resources=lesson.video_url or ''
-                        )
-            else:
-                for ws in weekly_objs:
-                    DailyTask.objects.create(
-                        weekly_schedule=ws,
-                        day_number=1,
-                        title=f'Bài học tuần {ws.week_number}',
-                        description='Nội dung học tập và video hướng dẫn',
-                        duration_minutes=60,
-                        resources=''
-                    )
-        
-        # 3. Tạo ghi danh (Enrollment)
-        enrollment, created_en = LearningPathEnrollment.objects.get_or_create(
-            user=user,
-            learning_path=learning_path,
-            defaults={
-                'assigned_by': request.user,
-                'start_date': _date.today(),
-                'status': 'active'
-            }
-        )
-        if not created_en:
-            enrollment.status = 'active'
-            if not enrollment.start_date:
-                enrollment.start_date = _date.today()
-            enrollment.assigned_by = request.user
-            enrollment.save()
+        messages.success(request, f'Đã duyệt thanh toán #{payment_id} thành công!')
+    except Exception as e:
+        messages.error(request, f'Lỗi khi duyệt thanh toán: {str(e)}')
         
-        # 4. Gửi email thông báo
-        try:
-            course_list_url = request.build_absolute_uri(reverse('my_courses'))
-            subject = '✅ Thanh toán đã được xác nhận - Khóa học đã được kích hoạt'
-            message = f'''
-Xin chào {user.get_full_name() or user.username}!
-
-Thanh toán của bạn cho khóa học "{course.title}" đã được xác nhận thành công.
-
-📚 THÔNG TIN KHÓA HỌC:
-• Tên khóa học: {course.title}
-• Số tiền: {payment.amount:,.0f} VNĐ
-• Phương thức: {payment.get_payment_method_display()}
-• Mã giao dịch: {payment.transaction_id or 'N/A'}
-• Thời gian xác nhận: {payment.approved_at.strftime('%d/%m/%Y %H:%M')}
-
-🎉 Khóa học đã được kích hoạt và sẵn sàng để bạn bắt đầu học!
+    return redirect('admin_dashboard')
 
-Bạn có thể truy cập khóa học tại: {course_list_url}
+@staff_member_required
+def admin_bulk_payments(request):
+    """Approve or reject every pending payment ticked on the dashboard in one go."""
+    if request.method != 'POST':
+        return redirect('admin_dashboard')
 
-Chúc bạn học tập hiệu quả!
+    action = request.POST.get('action')
+    payment_ids = [int(value) for value in request.POST.getlist('payment_ids') if value.isdigit()]
+    if action not in ('approve', 'reject') or not payment_ids:
+        messages.warning(request, 'Hãy chọn ít nhất một thanh toán và một thao tác.')
+        return redirect('admin_dashboard')
 
-Trân trọng,
-Đội ngũ Học Lập Trình
-            '''
-            send_mail(
-                subject,
-                message.strip(),
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=True,
-            )
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            
-        messages.success(request, f'Đã duyệt thanh toán #{payment.id} thành công!')
+    try:
+        if action == 'approve':
+            approved = approve_payments(payment_ids, request.user)
+            # Một kết nối SMTP cho cả lô email
+            send_payment_confirmations(approved, request.build_absolute_uri(reverse('my_courses')))
+            messages.success(request, f'Đã duyệt {len(approved)} thanh toán.')
+        else:
+            rejected = reject_payments(payment_ids)
+            messages.warning(request, f'Đã từ chối {rejected} thanh toán.')
     except Exception as e:
-        messages.error(request, f'Lỗi khi duyệt thanh toán: {str(e)}')
-        
+        messages.error(request, f'Lỗi khi xử lý thanh toán: {str(e)}')
+
     return redirect('admin_dashboard')
 
 @staff_member_required
@@ -832,7 +756,8 @@ def user_dashboard(request):
             user=request.user
         ).select_related('course').order_by('-created_at')[:5]
         
-        # Thống kê cá nhân
+        # Thống kê cá nhân; số liệu diễn đàn đọc từ AuthorStats
+        forum_stats = author_stats(request.user)
         user_stats = {
             'total_courses': purchased_courses.count(),
             'total_spent': Payment.objects.filter(
@@ -840,7 +765,9 @@ def user_dashboard(request):
                 status='completed'
             ).aggregate(Sum('amount'))['amount__sum'] or 0,
             'courses_in_cart': cart_courses.count(),
-            'total_posts': ForumPost.objects.filter(author=request.user).count(),
+            'total_posts': forum_stats.post_count,
+            'total_comments': forum_stats.comment_count,
+            'total_likes': forum_stats.likes_received,
             'total_reviews': Review.objects.filter(user=request.user).count(),
         }
         
@@ -930,25 +857,13 @@ def custom_logout(request):
 
 # Tạo view chi tiết khóa học với hiển thị đánh giá và form đánh giá
 def course_detail(request, course_id):
-    course = get_object_or_404(Course, id=course_id)
-    reviews = Review.objects.filter(course=course).order_by('-created_at')
+    course = get_object_or_404(Course.objects.select_related('stats'), id=course_id)
+    reviews = Review.objects.filter(course=course).select_related('user').order_by('-created_at')
+    stats = getattr(course, 'stats', None)
     
-    # Kiểm tra user đã mua khóa học chưa
-    user_has_purchased = False
-    if request.user.is_authenticated:
-        user_has_purchased = Payment.objects.filter(
-            user=request.user, 
-            course=course, 
-            status='completed'
-        ).exists()
-        # Nếu admin đã gán learning path cho user, cũng coi là có quyền truy cập
-        if not user_has_purchased:
-            from .models import LearningPathEnrollment
-            user_has_purchased = LearningPathEnrollment.objects.filter(
-                user=request.user,
-                learning_path__course=course,
-                status='active'
-            ).exists()
+    # Kiểm tra user đã mua khóa học chưa (hoặc được admin gán lộ trình)
+    course_state = get_user_course_state(request)
+    user_has_purchased = course.id in course_state.accessible
     
     # Kiểm tra user đã review chưa
     user_review = None
@@ -977,8 +892,9 @@ def course_detail(request, course_id):
         'user_has_purchased': user_has_purchased,
         'user_review': user_review,
         'form': form,
-        'average_rating': reviews.aggregate(Avg('rating'))['rating__avg'] or 0,
-        'total_reviews': reviews.count()
+        'average_rating': stats.average_rating if stats else 0,
+        'total_reviews': stats.review_count if stats else 0,
+        'course_state': course_state,
     })
 
 
@@ -1019,43 +935,43 @@ def submit_review(request, course_id):
     
     return JsonResponse({'success': False, 'error': 'Invalid request'})
 
+def _page_query(request):
+    # Tham số hiện tại (trừ vị trí trang) để nối vào link phân trang
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    params.pop('page', None)
+    return params.urlencode()
+
+
 # Danh sách bài viết diễn đàn với tìm kiếm và lọc tags
 def forum_list(request):
     search_query = request.GET.get('q', '')
     tag_filter = request.GET.get('tag', '')
-    sort = request.GET.get('sort', 'new')
+    sort = request.GET.get('sort', DEFAULT_FORUM_SORT)
+    if sort not in FORUM_ORDERINGS:
+        sort = DEFAULT_FORUM_SORT
     
-    posts = ForumPost.objects.annotate(
-        like_count=Count('postlike'),
-        comment_count=Count('comments')
-    )
+    posts = forum_queryset()
     
     if search_query:
-        posts = posts.filter(
-            Q(title__icontains=search_query) |
-            Q(content__icontains=search_query) |
-            Q(tags__icontains=search_query)
-        )
+        # So khớp không dấu: "lap trinh" tìm được "Lập Trình"
+        posts = posts.filter(search_text__contains=normalize_search_text(search_query))
     
     if tag_filter:
-        posts = posts.filter(tags__icontains=tag_filter)
-
-    # Sorting: new (latest), popular (most likes), comments (most commented)
-    if sort == 'popular':
-        posts = posts.order_by('-like_count', '-created_at')
-    elif sort == 'comments':
-        posts = posts.order_by('-comment_count', '-created_at')
-    else:
-        posts = posts.order_by('-created_at')
+        # Join qua bảng Tag (name có unique index), không quét chuỗi tags
+        posts = posts.filter(tag_set__name=tag_filter.lower())
+
+    # Sắp xếp new (mới nhất), popular (nhiều like), comments (nhiều bình luận);
+    # bài ghim luôn ở đầu. Phân trang phía server.
+    posts = forum_page(request, posts, sort, salt=f'forum-cursor:{sort}')
+    # Trạng thái đã thích của cả trang trong một truy vấn
+    liked_ids = liked_post_ids(request.user, [post.id for post in posts])
     
     # Lấy danh sách tags phổ biến
-    popular_tags = ForumPost.objects.exclude(tags__isnull=True).exclude(tags__exact='')\
-        .values_list('tags', flat=True)
+    popular_tags = popular_forum_tags()
     
-    # Community stats for hero
-    total_posts = ForumPost.objects.count()
-    total_comments = PostComment.objects.count()
-    active_users = User.objects.count()
+    # Số liệu cộng đồng lấy từ cache (courses.community), không COUNT cả bảng
+    community = community_stats()
 
     return render(request, 'courses/forum_list.html', {
         'posts': posts,
@@ -1063,82 +979,119 @@ def forum_list(request):
         'tag_filter': tag_filter,
         'popular_tags': popular_tags,
         'sort': sort,
-        'total_posts': total_posts,
-        'total_comments': total_comments,
-        'active_users': active_users
+        'page_query': _page_query(request),
+        'liked_ids': liked_ids,
+        'total_posts': community['posts'],
+        'total_comments': community['comments'],
+        'active_users': community['users']
     })
 
 
 def forum_tag(request, tag):
-    posts = ForumPost.objects.annotate(
-        like_count=Count('postlike'),
-        comment_count=Count('comments')
-    ).filter(tags__icontains=tag)
+    sort = request.GET.get('sort', DEFAULT_FORUM_SORT)
+    if sort not in FORUM_ORDERINGS:
+        sort = DEFAULT_FORUM_SORT
+    posts = forum_queryset().filter(tag_set__name=tag.lower())
+    posts = forum_page(request, posts, sort, salt=f'forum-cursor:{sort}')
 
-    popular_tags = ForumPost.objects.exclude(tags__isnull=True).exclude(tags__exact='')\
-        .values_list('tags', flat=True)
+    popular_tags = popular_forum_tags()
 
     return render(request, 'courses/forum_list.html', {
         'posts': posts,
         'search_query': '',
         'tag_filter': tag,
+        'sort': sort,
+        'page_query': _page_query(request),
+        'liked_ids': liked_post_ids(request.user, [post.id for post in posts]),
         'popular_tags': popular_tags
     })
 
 
+def _recent_activity_etag(request):
+    # Max id của bài viết/bình luận (bài mới) + phiên bản trong cache (sửa/xóa):
+    # poll khi không có gì thay đổi nhận 304
+    request._activity_marker = activity_marker()
+    return f'{format_activity_cursor(request._activity_marker)}-{activity_version()}'
+
+
+@require_GET
+@condition(etag_func=_recent_activity_etag)
 def recent_activity(request):
-    """Return recent activity (posts and comments) as JSON for polling updates."""
-    # Get recent posts and comments
-    recent_posts = list(ForumPost.objects.all().order_by('-created_at')[:10].values(
-        'id', 'author__username', 'title', 'created_at'))
-    recent_comments = list(PostComment.objects.all().order_by('-created_at')[:10].values(
-        'id', 'author__username', 'post_id', 'content', 'created_at'))
-
-    # Normalize and merge
-    events = []
-    for p in recent_posts:
-        events.append({
-            'type': 'post',
-            'id': p['id'],
-            'user': p['author__username'],
-            'title': p['title'],
-            'created_at': p['created_at'].isoformat()
-        })
-    for c in recent_comments:
-        events.append({
-            'type': 'comment',
-            'id': c['id'],
-            'user': c['author__username'],
-            'post_id': c['post_id'],
-            'content': c['content'][:140],
-            'created_at': c['created_at'].isoformat()
-        })
+    """Return recent activity (posts and comments) as JSON for polling updates.
+
+    `since=<cursor>` (the `cursor` of a previous response) returns only newer events.
+    """
+    since = parse_activity_cursor(request.GET.get('since'))
+    response = JsonResponse({
+        'events': load_recent_activity(since=since),
+        'cursor': format_activity_cursor(request._activity_marker),
+    })
+    response['Cache-Control'] = 'no-cache'
+    return response
 
-    # Sort by created_at desc and limit
-    events_sorted = sorted(events, key=lambda e: e['created_at'], reverse=True)[:10]
 
-    return JsonResponse({'events': events_sorted})
+def _last_event_id(request):
+    # EventSource gửi lại Last-Event-ID khi tự kết nối lại
+    raw = request.headers.get('Last-Event-ID') or request.GET.get('last_id') or 0
+    try:
+        return max(int(raw), 0)
+    except ValueError:
+        return 0
+
+
+async def activity_stream(request):
+    """Server-Sent Events feed of new posts and comments (serve via ASGI)."""
+    await sync_to_async(activity_bus.ensure_seeded)()
+    last_id = _last_event_id(request)
+
+    async def events():
+        nonlocal last_id
+        yield f'retry: {RETRY_MS}\n\n'
+        deadline = time.monotonic() + STREAM_MAX_AGE
+        while time.monotonic() < deadline:
+            batch = await activity_bus.wait(last_id, KEEPALIVE_INTERVAL)
+            if not batch:
+                # Giữ kết nối qua proxy khi không có gì mới
+                yield ': keepalive\n\n'
+            for event in batch:
+                last_id = event['seq']
+                yield f"id: {event['seq']}\nevent: activity\ndata: {json.dumps(event)}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def activity_poll(request):
+    """Long-poll fallback: answers as soon as there are events after `last_id`."""
+    await sync_to_async(activity_bus.ensure_seeded)()
+    last_id = _last_event_id(request)
+    if last_id:
+        events = await activity_bus.wait(last_id, LONG_POLL_TIMEOUT)
+    else:
+        events = activity_bus.since(0)
+    return JsonResponse({'events': events, 'last_id': activity_bus.last_seq})
 
 
 def user_profile(request, username):
     from django.contrib.auth import get_user_model
     User = get_user_model()
-    user = get_object_or_404(User, username=username)
-
-    # User stats
-    posts = ForumPost.objects.filter(author=user).annotate(
-        like_count=Count('postlike'),
-        comment_count=Count('comments')
-    ).order_by('-created_at')
+    user = get_object_or_404(User.objects.select_related('forum_stats'), username=username)
+    stats = author_stats(user)
 
-    author_posts_count = posts.count()
-    author_comments_count = PostComment.objects.filter(author=user).count()
+    posts = forum_queryset().filter(author=user)
+    # Keyset theo (created_at, id), dùng index forumpost_author_idx
+    posts = KeysetPaginator(posts, PROFILE_ORDERING, FORUM_PAGE_SIZE, salt='profile-cursor')\
+        .page(request.GET.get('cursor'))
 
     return render(request, 'courses/user_profile.html', {
         'profile_user': user,
         'posts': posts,
-        'author_posts_count': author_posts_count,
-        'author_comments_count': author_comments_count
+        'page_query': _page_query(request),
+        'author_posts_count': stats.post_count,
+        'author_comments_count': stats.comment_count,
+        'author_likes_received': stats.likes_received
     })
 
 
@@ -1152,7 +1105,8 @@ def forum_toggle_pin(request, post_id):
         return HttpResponse(status=403)
 
     post.is_pinned = not bool(post.is_pinned)
-    post.save()
+    # Chỉ ghi cột đổi: không ghi đè like_count/comment_count/views đang tăng bằng F()
+    post.save(update_fields=['is_pinned'])
     messages.success(request, 'Đã cập nhật trạng thái ghim bài viết.')
     return redirect('forum_detail', post_id=post.id)
 
@@ -1167,7 +1121,7 @@ def forum_toggle_feature(request, post_id):
         return HttpResponse(status=403)
 
     post.is_featured = not bool(post.is_featured)
-    post.save()
+    post.save(update_fields=['is_featured'])
     messages.success(request, 'Đã cập nhật trạng thái nổi bật của bài viết.')
     return redirect('forum_detail', post_id=post.id)
 
@@ -1191,69 +1145,65 @@ def forum_create(request):
     return render(request, 'courses/forum_create.html')
 
 def forum_detail(request, post_id):
-    post = get_object_or_404(
-        ForumPost.objects.annotate(
-            like_count=Count('postlike'),
-            comment_count=Count('comments')
-        ), 
-        id=post_id
-    )
+    # Thống kê tác giả (AuthorStats) JOIN cùng truy vấn lấy bài viết
+    post = get_object_or_404(ForumPost.objects.select_related('author__forum_stats'), id=post_id)
     
     # Kiểm tra user đã like chưa
     user_has_liked = False
     if request.user.is_authenticated:
         user_has_liked = PostLike.objects.filter(user=request.user, post=post).exists()
 
-    # Tăng lượt xem (atomic) và tính các thông số động
-    ForumPost.objects.filter(id=post.id).update(views=F('views') + 1)
-    post.refresh_from_db(fields=['views'])
+    # Lượt xem ghi trễ qua cache khi bật FORUM_BUFFER_VIEWS (view_counter); hiển thị = giá trị đã lưu + phần chờ ghi
+    post.views += record_view(post.id)
 
-    # Paginate comments for the post (used by template's load-more)
-    comments_qs = post.comments.all().order_by('created_at')
-    page_number = request.GET.get('cpage', 1)
-    paginator = Paginator(comments_qs, 5)
-    comments_page = paginator.get_page(page_number)
+    # Trang bình luận đầu tiên; "Tải thêm" gọi forum_comments với after=<id>
+    comments, comments_next_after = comment_page(post.id)
 
     # Tổng số bình luận cho post (toàn bộ, không phải page)
-    post_total_comments = comments_qs.count()
-
-    # Ước lượng thời gian đọc (phút) dựa trên từ (khoảng 200 wpm)
-    words = 0
-    if post.content:
-        words = len(post.content.split())
-    reading_time = max(1, (words + 199) // 200)
+    post_total_comments = post.comment_count
 
     # Author stats
-    author = post.author
-    author_posts_count = ForumPost.objects.filter(author=author).count()
-    author_comments_count = PostComment.objects.filter(author=author).count()
+    author_row = author_stats(post.author)
 
-    # Related posts (simple heuristic: other posts ordered by comment & like)
-    related_posts = ForumPost.objects.annotate(
-        like_count=Count('postlike'),
-        comment_count=Count('comments')
-    ).exclude(id=post.id).order_by('-comment_count', '-like_count')[:5]
+    # Bài viết liên quan tính sẵn theo nội dung (courses.related), một truy vấn
+    related_posts = [
+        link.related for link in RelatedPost.objects.filter(post=post).select_related('related').order_by('rank')
+    ]
 
-    # Community statistics (global)
-    total_posts = ForumPost.objects.count()
-    total_comments = PostComment.objects.count()
-    total_users = User.objects.count()
+    # Community statistics (global), từ cache
+    community = community_stats()
 
     return render(request, 'courses/forum_detail.html', {
         'post': post,
-        'comments': comments_page,
+        'comments': comments,
+        'comments_next_after': comments_next_after,
         'user_has_liked': user_has_liked,
         'like_count': post.like_count,
         'post_total_comments': post_total_comments,
-        'total_posts': total_posts,
-        'total_comments': total_comments,
-        'total_users': total_users,
-        'reading_time': reading_time,
-        'author_posts_count': author_posts_count,
-        'author_comments_count': author_comments_count,
+        'total_posts': community['posts'],
+        'total_comments': community['comments'],
+        'total_users': community['users'],
+        'reading_time': post.reading_time,
+        'author_posts_count': author_row.post_count,
+        'author_comments_count': author_row.comment_count,
+        'author_likes_received': author_row.likes_received,
         'related_posts': related_posts
     })
 
+@require_GET
+def forum_comments(request, post_id):
+    """JSON page of a thread's comments after the `after` comment id, oldest first."""
+    post_author_id = get_object_or_404(ForumPost.objects.values_list('author_id', flat=True), pk=post_id)
+    try:
+        after_id = int(request.GET.get('after', 0))
+    except ValueError:
+        after_id = 0
+    comments, next_after = comment_page(post_id, after_id)
+    return JsonResponse({
+        'comments': [comment_json(comment, post_author_id) for comment in comments],
+        'next_after': next_after,
+    })
+
 @login_required
 def forum_edit(request, post_id):
     post = get_object_or_404(ForumPost, id=post_id, author=request.user)
@@ -1262,7 +1212,7 @@ def forum_edit(request, post_id):
         post.title = request.POST.get('title', post.title)
         post.content = request.POST.get('content', post.content)
         post.tags = request.POST.get('tags', post.tags)
-        post.save()
+        post.save(update_fields=['title', 'content', 'tags', 'updated_at'])
         messages.success(request, 'Đã cập nhật bài viết!')
         return redirect('forum_detail', post_id=post.id)
     
@@ -1271,19 +1221,11 @@ def forum_edit(request, post_id):
 @login_required
 def toggle_like(request, post_id):
     if request.method == 'POST':
-        post = get_object_or_404(ForumPost, id=post_id)
-        like, created = PostLike.objects.get_or_create(
-            user=request.user,
-            post=post
-        )
-        
-        if not created:
-            like.delete()
-            liked = False
-        else:
-            liked = True
-        
-        like_count = PostLike.objects.filter(post=post).count()
+        # Một transaction, khóa dòng bài viết: không còn get_or_create + COUNT
+        try:
+            liked, like_count = toggle_post_like(request.user, post_id)
+        except ForumPost.DoesNotExist:
+            raise Http404
         
         return JsonResponse({
             'liked': liked,
@@ -1292,6 +1234,13 @@ def toggle_like(request, post_id):
     
     return JsonResponse({'error': 'Invalid request'})
 
+
+@require_GET
+def forum_like_state(request):
+    """Which of `ids` (comma-separated post ids) the current user has liked."""
+    post_ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip().isdigit()]
+    return JsonResponse({'liked': sorted(liked_post_ids(request.user, post_ids[:FORUM_PAGE_SIZE * 5]))})
+
 @login_required
 def add_comment(request, post_id):
     if request.method == 'POST':
@@ -1310,6 +1259,7 @@ def add_comment(request, post_id):
                 'comment': {
                     'author': comment.author.username,
                     'content': comment.content,
+                    'content_html': comment.content_html,
                     'created_at': comment.created_at.strftime('%d/%m/%Y %H:%M'),
                     'avatar': '👤'  # Có thể thay bằng avatar thật
                 }
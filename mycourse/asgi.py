@@ -2,6 +2,8 @@
 ASGI config for mycourse project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+app.yaml serves it with gunicorn's uvicorn worker so the async forum activity
+stream (``courses.views.activity_stream``) does not tie up a worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
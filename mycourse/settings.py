@@ -126,6 +126,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'courses.context_processors.catalog_facets',
             ],
         },
     },
@@ -159,6 +160,30 @@ else:
         }
     }
 
+# --------------------------------------------------
+# CACHE (LocMem mặc định, dùng Redis nếu có REDIS_URL)
+# --------------------------------------------------
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mycourse-default',
+        }
+    }
+
+# Đệm lượt xem diễn đàn trong cache (courses.view_counter) cần cache dùng chung
+# cho mọi tiến trình; không có Redis thì mỗi lượt xem ghi thẳng vào DB
+FORUM_BUFFER_VIEWS = bool(REDIS_URL)
+
 # --------------------------------------------------
 # PASSWORD VALIDATION
 # --------------------------------------------------